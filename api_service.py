@@ -1,12 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from functools import wraps
+import json
 import os
 import jwt
 from datetime import datetime, timedelta
-from database import get_db, Product, PriceHistory
-from scraper import scrape_website
+from database import get_db, AsyncSessionLocal, Product, UrlFailure
+from scraper import host_breaker, is_valid_trendyol_url, scrape_website, scrape_website_sync
+import asyncio
 import logging
-from data_processor import clean_price
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import selectinload
+from data_processor import apply_scraped_update
+from pricing import reprice_catalog, sell_price
+from product_record import ProductRecord
+from search import search_products
+from tracing import profiled, profiling, span
+from url_health import record_failure, record_recovery
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +27,12 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key')
 
+# Toplu scraping ayarları
+BULK_SCRAPE_CONCURRENCY = int(os.getenv('BULK_SCRAPE_CONCURRENCY', '8'))
+BULK_SCRAPE_MAX_URLS = int(os.getenv('BULK_SCRAPE_MAX_URLS', '1000'))
+# Kayıtlı ürünleri yenilerken aynı anda çekilecek sayfa sayısı
+REFRESH_CONCURRENCY = int(os.getenv('REFRESH_CONCURRENCY', '8'))
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -28,6 +46,14 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def request_traced(f):
+    """İsteği kök span içinde çalıştır; profil modu açıksa yavaş istekler kaydedilir"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        with profiled(f"api.{f.__name__}", method=request.method, path=request.path):
+            return f(*args, **kwargs)
+    return decorated
+
 @app.route('/api/token', methods=['POST'])
 def generate_token():
     """API token oluştur"""
@@ -42,71 +68,109 @@ def generate_token():
         return jsonify({'token': token})
     return jsonify({'message': 'Geçersiz kimlik bilgileri!'}), 401
 
+async def refresh_products_async(concurrency: int = REFRESH_CONCURRENCY) -> Dict[str, int]:
+    """
+    Kayıtlı ürünleri tek event loop üzerinde en fazla `concurrency` eşzamanlı istekle çek ve async oturumla güncelle
+    Yakın zamanda başarısız olan URL'ler yeniden deneme zamanına kadar atlanır;
+    devresi açık host'ların ürünleri istek gönderilmeden sonraki yenilemeye bırakılır
+    """
+    updated_count = 0
+    failed_count = 0
+    deferred_count = 0
+    now = datetime.utcnow()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(product: Product) -> Tuple[Optional[List[ProductRecord]], Optional[str]]:
+        """Ürün sayfasını çek; devre açıksa (None, None), hata olursa ([], hata) döner"""
+        async with semaphore:
+            # Devre bu yenilemedeki önceki isteklerle açılmış olabilir
+            if host_breaker.is_open(urlsplit(product.source_url).netloc.lower()):
+                return None, None
+            try:
+                with span('api.refresh_product', product_id=product.id):
+                    return await scrape_website(product.source_url), None
+            except Exception as e:
+                return [], str(e)
+
+    async with AsyncSessionLocal() as db:
+        # Negatif önbellekteki URL'ler sorguda elenir; kalanların hata kaydı ürünle birlikte gelir
+        result = await db.execute(
+            select(Product, UrlFailure)
+            .outerjoin(UrlFailure, UrlFailure.url == Product.source_url)
+            .where(or_(UrlFailure.id.is_(None), UrlFailure.next_check_at <= now))
+            # Görsel karşılaştırması için (async oturumda lazy load yapılamaz)
+            .options(selectinload(Product.images))
+        )
+        rows = result.all()
+        skipped_count = (await db.execute(
+            select(func.count()).select_from(Product)
+            .join(UrlFailure, UrlFailure.url == Product.source_url)
+            .where(UrlFailure.next_check_at > now)
+        )).scalar()
+
+        # Sayfalar eşzamanlı çekilir; oturum eşzamanlı kullanılamadığından güncellemeler sırayla uygulanır
+        fetched = await asyncio.gather(*(fetch(product) for product, _ in rows))
+
+        for (product, failure), (raw_data, error) in zip(rows, fetched):
+            if raw_data is None:
+                deferred_count += 1
+                continue
+
+            if error is None:
+                try:
+                    if raw_data and len(raw_data) > 0:
+                        if apply_scraped_update(db, product, raw_data[0]):
+                            updated_count += 1
+                            if failure is not None:
+                                record_recovery(failure, product, raw_data[0])
+                                await db.delete(failure)
+                            continue
+                        error = 'Geçersiz fiyat'
+                    else:
+                        error = 'Veri çekilemedi'
+                    logger.warning(f"{error}: {product.source_url}")
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"Ürün güncelleme hatası ({product.source_url}): {error}")
+            else:
+                logger.error(f"Ürün güncelleme hatası ({product.source_url}): {error}")
+
+            failed_count += 1
+            # Devre bu istekle açıldıysa hata URL'ye değil host'a aittir
+            if not host_breaker.is_open(urlsplit(product.source_url).netloc.lower()):
+                db.add(record_failure(failure, product, error))
+
+        await db.commit()
+
+    if deferred_count:
+        logger.warning(f"Devresi açık host'lar nedeniyle {deferred_count} ürün ertelendi")
+    return {'updated': updated_count, 'failed': failed_count, 'skipped': skipped_count, 'deferred': deferred_count}
+
 @app.route('/api/products/update', methods=['POST'])
 @token_required
+@request_traced
 def update_products():
     """Ürünleri güncelle"""
     try:
-        db = next(get_db())
-        products = db.query(Product).all()
-        updated_count = 0
-        failed_count = 0
-        
-        for product in products:
-            try:
-                # Ürün verilerini çek
-                raw_data = scrape_website(product.source_url)
-                if raw_data and len(raw_data) > 0:
-                    # Fiyat güncelleme
-                    new_price = clean_price(str(raw_data[0].get('price', 0)))
-                    if new_price > 0:
-                        # Fiyat geçmişine ekle
-                        price_history = PriceHistory(
-                            product_id=str(product.id),
-                            price=new_price,
-                            platform='trendyol' if 'trendyol.com' in product.source_url else 'hepsiburada',
-                            tracked_at=datetime.utcnow()
-                        )
-                        db.add(price_history)
-                        
-                        # Ürün verilerini güncelle
-                        product.title = raw_data[0].get('title', product.title)
-                        product.description = raw_data[0].get('description', product.description)
-                        product.image_url = raw_data[0].get('image_urls', [None])[0] or product.image_url
-                        product.last_checked = datetime.utcnow()
-                        
-                        # Stok durumunu kontrol et
-                        if 'stock_status' in raw_data[0]:
-                            product.stock_status = raw_data[0]['stock_status']
-                        
-                        updated_count += 1
-                    else:
-                        failed_count += 1
-                        logger.warning(f"Geçersiz fiyat: {product.source_url}")
-                else:
-                    failed_count += 1
-                    logger.warning(f"Veri çekilemedi: {product.source_url}")
-                    
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Ürün güncelleme hatası ({product.source_url}): {str(e)}")
-                continue
-        
-        db.commit()
+        result = asyncio.run(refresh_products_async())
+        # Yeni kaynak fiyatlardan satış fiyatlarını tek geçişte hesapla
+        repriced = reprice_catalog()
         return jsonify({
             'message': 'Güncelleme tamamlandı',
-            'updated': updated_count,
-            'failed': failed_count
+            'updated': result['updated'],
+            'failed': result['failed'],
+            'skipped': result['skipped'],
+            'deferred': result['deferred'],
+            'repriced': repriced['changed']
         })
-    
+
     except Exception as e:
         logger.error(f"Genel güncelleme hatası: {str(e)}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
 
 @app.route('/api/products/status', methods=['GET'])
 @token_required
+@request_traced
 def get_product_status():
     """Ürün durumlarını getir"""
     try:
@@ -128,5 +192,153 @@ def get_product_status():
     finally:
         db.close()
 
+@app.route('/api/products/search', methods=['GET'])
+@token_required
+@request_traced
+def search_product_catalog():
+    """Başlık, açıklama ve kategoride tam metin ürün araması"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Arama metni (q) gerekli!'}), 400
+
+    # Sayısal olmayan parametreler yok sayılır (Flask varsayılan değeri döndürür)
+    in_stock = request.args.get('in_stock')
+    filters = {
+        'in_stock': None if in_stock is None else in_stock.lower() in ('1', 'true', 'yes'),
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'page': request.args.get('page', default=1, type=int),
+        'per_page': request.args.get('per_page', default=20, type=int),
+    }
+
+    db = next(get_db())
+    try:
+        return jsonify(search_products(db, query, **filters))
+    except Exception as e:
+        logger.error(f"Arama hatası: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+def ndjson_line(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False) + '\n'
+
+def iter_request_urls() -> Iterator[str]:
+    """Düz metin veya NDJSON gövdeden URL'leri satır satır oku (gövde belleğe alınmaz)"""
+    for raw_line in request.stream:
+        line = raw_line.decode('utf-8').strip()
+        if not line:
+            continue
+        # NDJSON'da her satır bir JSON dizgesi ya da {"url": ...} nesnesidir
+        if line[0] in '"{':
+            try:
+                value = json.loads(line)
+            except ValueError:
+                yield line
+                continue
+            yield value.get('url', '') if isinstance(value, dict) else value
+        else:
+            yield line
+
+def stream_bulk_scrape(urls: Iterable[Any], concurrency: int = BULK_SCRAPE_CONCURRENCY) -> Iterator[str]:
+    """
+    URL'leri en fazla `concurrency` eşzamanlı işle çek ve her sonucu biter bitmez NDJSON satırı olarak ver
+    Girdi tembel okunur: bekleyen iş sayısı sınırlı olduğundan büyük partiler bellekte tutulmaz
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = {}
+    indexed = enumerate(urls)
+    summary = {'done': True, 'total': 0, 'succeeded': 0, 'failed': 0, 'truncated': False}
+    # Kök span akış boyunca açık kalır: görünüm fonksiyonu ilk satırdan önce döner
+    with profiled('api.bulk_scrape', concurrency=concurrency) as root:
+        try:
+            while True:
+                while len(pending) < concurrency:
+                    item = next(indexed, None)
+                    if item is None:
+                        break
+                    index, url = item
+                    if index >= BULK_SCRAPE_MAX_URLS:
+                        summary['truncated'] = True
+                        break
+                    summary['total'] += 1
+                    if not isinstance(url, str) or not is_valid_trendyol_url(url):
+                        summary['failed'] += 1
+                        yield ndjson_line({'index': index, 'url': url, 'ok': False, 'error': 'Geçersiz Trendyol URL\'si'})
+                        continue
+                    pending[executor.submit(scrape_website_sync, url.strip())] = (index, url)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, url = pending.pop(future)
+                    try:
+                        products = future.result()
+                        error = None if products else 'Veri çekilemedi'
+                    except Exception as e:
+                        products, error = [], str(e)
+                    if error:
+                        summary['failed'] += 1
+                        yield ndjson_line({'index': index, 'url': url, 'ok': False, 'error': error})
+                        continue
+                    summary['succeeded'] += 1
+                    product = products[0].to_dict()
+                    product['sell_price'] = sell_price(product['price'], product.get('category'))
+                    yield ndjson_line({'index': index, 'url': url, 'ok': True, 'product': product})
+
+            root.set(**{key: value for key, value in summary.items() if key != 'done'})
+            yield ndjson_line(summary)
+        finally:
+            # İstemci bağlantıyı keserse başlamamış işler iptal edilir
+            executor.shutdown(wait=False, cancel_futures=True)
+
+@app.route('/api/products/scrape', methods=['POST'])
+@token_required
+def bulk_scrape():
+    """
+    URL listesini eşzamanlı çek ve sonuçları tamamlandıkça NDJSON olarak akıt
+    Gövde: {"urls": [...]} ya da satır başına bir URL (text/plain, application/x-ndjson)
+    """
+    concurrency = max(1, min(request.args.get('concurrency', default=BULK_SCRAPE_CONCURRENCY, type=int),
+                             BULK_SCRAPE_CONCURRENCY))
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        urls = payload.get('urls') if isinstance(payload, dict) else None
+        if not isinstance(urls, list) or not urls:
+            return jsonify({'message': 'URL listesi (urls) gerekli!'}), 400
+        if len(urls) > BULK_SCRAPE_MAX_URLS:
+            return jsonify({'message': f'En fazla {BULK_SCRAPE_MAX_URLS} URL gönderilebilir!'}), 400
+    else:
+        urls = iter_request_urls()
+
+    return Response(
+        stream_with_context(stream_bulk_scrape(urls, concurrency)),
+        mimetype='application/x-ndjson',
+        # Ters vekil sunucuların yanıtı biriktirmemesi için
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'},
+    )
+
+@app.route('/api/debug/profiling', methods=['GET', 'POST'])
+@token_required
+def profiling_settings():
+    """Profil modunu yeniden dağıtım yapmadan aç/kapat ve eşiği ayarla"""
+    if request.method == 'POST':
+        settings = request.get_json(silent=True) or {}
+        if 'enabled' in settings:
+            profiling.enabled = bool(settings['enabled'])
+        if 'threshold_ms' in settings:
+            profiling.threshold_ms = float(settings['threshold_ms'])
+        if 'memory' in settings:
+            profiling.memory = bool(settings['memory'])
+        logger.info(f"Profil ayarları güncellendi: {profiling.as_dict()}")
+    return jsonify(profiling.as_dict())
+
+@app.route('/api/debug/circuit-breakers', methods=['GET'])
+@token_required
+def circuit_breaker_status():
+    """Host başına devre kesici durumları"""
+    return jsonify(host_breaker.as_dict())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
@@ -0,0 +1,201 @@
+import argparse
+import gc
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Benchmark'lar veritabanına dokunmaz; database modülü yine de bir URL bekler
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from bs4 import BeautifulSoup
+import scraper
+from product_record import ProductRecord
+from data_processor import transform_data
+from main import convert_to_shopify_csv
+from utils import export_data
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+ASSETS_DIR = BASE_DIR / 'TrendyFetch' / 'attached_assets'
+PAGE_PATTERN = 'Pasted--DOCTYPE-html-html-lang-tr-TR-*.txt'
+BASELINE_FILE = BASE_DIR / 'benchmark_baseline.json'
+
+DEFAULT_ITERATIONS = 20
+DEFAULT_BATCH_SIZE = 500
+# p50 gecikme veya tepe bellek bu oranın üzerinde artarsa gerileme sayılır
+REGRESSION_THRESHOLD = 0.25
+# Gürültüyü elemek için mutlak alt sınırlar (bunların altındaki farklar gerileme sayılmaz)
+NOISE_FLOOR = {'p50_ms': 1.0, 'peak_kb': 64.0}
+
+def load_pages() -> Dict[str, str]:
+    """Kaydedilmiş Trendyol ürün sayfalarını yükle"""
+    pages = {
+        path.name: path.read_text(encoding='utf-8')
+        for path in sorted(ASSETS_DIR.glob(PAGE_PATTERN))
+    }
+    if not pages:
+        raise FileNotFoundError(f"Benchmark sayfaları bulunamadı: {ASSETS_DIR}")
+    return pages
+
+def build_batch(products: List[ProductRecord], size: int) -> List[ProductRecord]:
+    """Ayrıştırılmış ürünlerden benzersiz başlıklı büyük bir parti oluştur"""
+    batch = []
+    for index, product in zip(range(size), itertools.cycle(products)):
+        batch.append(product.copy(title=f"{product.title} {index}"))
+    return batch
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 2) -> Dict[str, float]:
+    """Gecikme yüzdeliklerini ve (ayrı bir çalıştırmada) bellek kullanımını ölç"""
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    gc.collect()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Bellek ölçümü gecikmeyi bozmasın diye ayrı yapılır
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocations = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'lineno'))
+    del result
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3),
+        'peak_kb': round(peak / 1024, 1),
+        'allocations': allocations,
+    }
+
+def build_benchmarks(batch_size: int) -> Dict[str, Callable[[], Any]]:
+    """Benchmark adlarını ölçülecek fonksiyonlara eşle"""
+    pages = list(load_pages().values())
+    soups = [BeautifulSoup(html, 'html.parser') for html in pages]
+    products = [product for html in pages for product in scraper.parse_product_html(html)]
+    if not products:
+        raise RuntimeError("Kaydedilmiş sayfalardan ürün çıkarılamadı")
+
+    batch = build_batch(products, batch_size)
+    frame = transform_data(batch)
+
+    # Her çağrıda sıradaki sayfa kullanılır
+    next_page = itertools.cycle(pages).__next__
+    next_soup = itertools.cycle(soups).__next__
+    next_product = itertools.cycle(products).__next__
+
+    return {
+        'scraper.soup': lambda: BeautifulSoup(next_page(), 'html.parser'),
+        'scraper.extract_title_from_html': lambda: scraper.extract_title_from_html(next_soup()),
+        'scraper.extract_price_from_html': lambda: scraper.extract_price_from_html(next_soup()),
+        'scraper.extract_images_from_html': lambda: scraper.extract_images_from_html(next_soup()),
+        'scraper.extract_category_from_html': lambda: scraper.extract_category_from_html(next_soup()),
+        'scraper.parse_product_html': lambda: scraper.parse_product_html(next_page()),
+        'main.convert_to_shopify_csv': lambda: convert_to_shopify_csv(next_product()),
+        f'data_processor.transform_data[{batch_size}]': lambda: transform_data(batch),
+        f'utils.export_data.csv[{batch_size}]': lambda: export_data(frame, 'csv'),
+        f'utils.export_data.excel[{batch_size}]': lambda: export_data(frame, 'excel'),
+        f'utils.export_data.parquet[{batch_size}]': lambda: export_data(frame, 'parquet'),
+    }
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                        threshold: float) -> List[str]:
+    """Baseline'a göre gerilemeleri bul"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for metric in ('p50_ms', 'peak_kb'):
+            if not reference.get(metric) or result[metric] - reference[metric] < NOISE_FLOOR[metric]:
+                continue
+            if result[metric] > reference[metric] * (1 + threshold):
+                change = (result[metric] / reference[metric] - 1) * 100
+                regressions.append(f"{name}: {metric} {reference[metric]} -> {result[metric]} (+{change:.0f}%)")
+    return regressions
+
+def print_report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    header = f"{'benchmark':<45} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>10} {'allocs':>8} {'vs base':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        reference = baseline.get(name, {}).get('p50_ms')
+        delta = f"{(result['p50_ms'] / reference - 1) * 100:+.0f}%" if reference else '-'
+        print(f"{name:<45} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+              f"{result['peak_kb']:>10.1f} {result['allocations']:>8} {delta:>8}")
+
+def run(iterations: int = DEFAULT_ITERATIONS, batch_size: int = DEFAULT_BATCH_SIZE,
+        only: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Tüm (veya adı filtreyle eşleşen) benchmark'ları çalıştır"""
+    benchmarks = build_benchmarks(batch_size)
+    results = {}
+    for name, fn in benchmarks.items():
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, iterations)
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ayrıştırıcı ve dışa aktarım benchmark'ları")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--only', help="Sadece adı bu metni içeren benchmark'ları çalıştır")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Sonuçları baseline olarak kaydet")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--json', type=Path, help="Sonuçları JSON olarak bu dosyaya yaz")
+    args = parser.parse_args()
+
+    # Ölçüm sırasında ayrıştırıcı loglarını sustur
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ('scraper', 'data_processor'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    results = run(args.iterations, args.batch_size, args.only)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    print_report(results, baseline)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        logger.info(f"Baseline kaydedildi: {args.baseline}")
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print("\nGerilemeler:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
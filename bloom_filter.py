@@ -0,0 +1,87 @@
+import hashlib
+import math
+import os
+import struct
+from pathlib import Path
+from typing import Iterable, Union
+
+# Dosya başlığı: imza, bit sayısı, hash sayısı, eklenen öğe sayısı, kapasite
+_MAGIC = b'BLM1'
+_HEADER = struct.Struct('<4sQQQQ')
+
+class BloomFilter:
+    """
+    Sabit bellekli olasılıksal küme: yanlış negatif yoktur, yanlış pozitif oranı
+    kapasite aşılmadıkça error_rate civarında kalır
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        # Çift hash (Kirsch-Mitzenmacher): k konum iki 64 bitlik değerden türetilir
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> bool:
+        """Öğeyi ekle; öğe daha önce (muhtemelen) yoksa True döner"""
+        added = False
+        for pos in self._positions(item):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def update(self, items: Iterable[str]) -> None:
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Filtreyi diske yaz (geçici dosya üzerinden atomik olarak)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.count, self.capacity))
+            f.write(self._bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'BloomFilter':
+        """Diskteki filtreyi oku"""
+        with open(path, 'rb') as f:
+            magic, num_bits, num_hashes, count, capacity = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"Geçersiz Bloom filtresi dosyası: {path}")
+            bits = bytearray(f.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"Eksik Bloom filtresi dosyası: {path}")
+
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.count = count
+        bloom._bits = bits
+        return bloom
@@ -0,0 +1,149 @@
+import argparse
+import csv
+import logging
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import pandas as pd
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Breadcrumb yolu -> Shopify kategorisi/ürün tipi eşleme tablosu
+CATEGORY_MAPPING_PATH = Path(os.getenv('CATEGORY_MAPPING_PATH', Path(__file__).parent / 'category_mapping.csv'))
+CATEGORY_CACHE_SIZE = int(os.getenv('CATEGORY_CACHE_SIZE', '4096'))
+
+DEFAULT_SHOPIFY_CATEGORY = 'Clothing & Accessories > General'
+DEFAULT_PRODUCT_TYPE = 'General'
+
+# Yol ayracı: kendi biçimimiz ('Giyim > T-Shirt') ve Trendyol hiyerarşisi ('Giyim/T-Shirt')
+PATH_SPLIT_PATTERN = re.compile(r'\s*[>/]\s*')
+# Büyük-küçük harf dönüşümünde Türkçe kuralı: İ -> i, I -> ı
+TURKISH_UPPER = str.maketrans({'İ': 'i', 'I': 'ı'})
+ASCII_FOLD = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+NON_ALNUM_PATTERN = re.compile(r'[^0-9a-z]+')
+
+Classification = Tuple[str, str]
+
+def normalize_segment(name: str) -> str:
+    """Kategori adını karşılaştırma biçimine indir: 'Ev & Mobilya', 'EV VE MOBİLYA' -> 'ev ve mobilya'"""
+    name = name.translate(TURKISH_UPPER).lower().translate(ASCII_FOLD).replace('&', ' ve ')
+    return NON_ALNUM_PATTERN.sub(' ', name).strip()
+
+def split_path(path: Union[str, Sequence[str], None]) -> Tuple[str, ...]:
+    """Yolu normalize edilmiş halkalara ayır; boş halkalar atlanır"""
+    if not path:
+        return ()
+    parts = PATH_SPLIT_PATTERN.split(path) if isinstance(path, str) else path
+    segments = (normalize_segment(part) for part in parts if isinstance(part, str))
+    return tuple(segment for segment in segments if segment)
+
+class TrieNode:
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children: Dict[str, 'TrieNode'] = {}
+        self.value: Optional[Classification] = None
+
+class CategoryClassifier:
+    """
+    Breadcrumb yolunu Shopify kategorisine ve ürün tipine eşler
+    Tablodaki yollar kökten başlayan bir trie'de tutulur, en uzun önek eşleşmesi aranır.
+    Tek halkalı satırlar ayrıca ad olarak da aranır: yolun daha derin bir halkası bir adla
+    eşleşirse (örn. '... > Eşofman Altı') o eşleşme kullanılır. Sonuçlar yol başına önbelleklenir.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str]],
+                 default: Classification = (DEFAULT_SHOPIFY_CATEGORY, DEFAULT_PRODUCT_TYPE)):
+        self.default = default
+        self.root = TrieNode()
+        self.names: Dict[str, Classification] = {}
+        for path, shopify_category, product_type in rows:
+            segments = split_path(path)
+            if not segments:
+                continue
+            node = self.root
+            for segment in segments:
+                node = node.children.setdefault(segment, TrieNode())
+            node.value = (shopify_category, product_type)
+            if len(segments) == 1:
+                self.names[segments[0]] = node.value
+        self._cached = lru_cache(maxsize=CATEGORY_CACHE_SIZE)(self._classify)
+
+    def _classify(self, path: Union[str, Tuple[str, ...]]) -> Classification:
+        segments = split_path(path)
+
+        # Kökten en uzun önek eşleşmesi
+        match, match_depth = None, 0
+        node = self.root
+        for depth, segment in enumerate(segments, 1):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.value is not None:
+                match, match_depth = node.value, depth
+
+        # Önekten daha derindeki halkalarda ad eşleşmesi (en derin olan kazanır)
+        for depth in range(len(segments), match_depth, -1):
+            value = self.names.get(segments[depth - 1])
+            if value is not None:
+                return value
+
+        return match or self.default
+
+    def classify(self, path: Union[str, Sequence[str], None]) -> Classification:
+        """Tek yol için (Shopify kategorisi, ürün tipi)"""
+        if not path:
+            return self.default
+        return self._cached(path if isinstance(path, str) else tuple(path))
+
+    def classify_series(self, paths: pd.Series) -> pd.DataFrame:
+        """Yol sütununu sınıflandır; tekrar eden yollar önbellekten gelir (Series.map'ten hızlı)"""
+        values = [self.classify(path if isinstance(path, str) else None) for path in paths.tolist()]
+        return pd.DataFrame({
+            'Product Category': [value[0] for value in values],
+            'Type': [value[1] for value in values],
+        }, index=paths.index)
+
+def read_mapping_rows(path: Union[str, Path]) -> List[Tuple[str, str, str]]:
+    with open(path, encoding='utf-8', newline='') as f:
+        return [(row['path'], row['shopify_category'], row['product_type']) for row in csv.DictReader(f)]
+
+# Dosya değişmedikçe sınıflandırıcı yeniden kurulmaz: (yol, değişiklik zamanı) -> sınıflandırıcı
+_classifier_cache: Dict[Any, CategoryClassifier] = {}
+
+def load_category_classifier(path: Union[str, Path] = CATEGORY_MAPPING_PATH) -> CategoryClassifier:
+    """Eşleme tablosundan sınıflandırıcıyı kur; tablo yoksa her yol varsayılan kategoriye düşer"""
+    path = Path(path)
+    try:
+        key = (str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        key = (str(path), None)
+    classifier = _classifier_cache.get(key)
+    if classifier is None:
+        if key[1] is None:
+            logger.warning(f"Kategori eşleme tablosu bulunamadı: {path}")
+            classifier = CategoryClassifier([])
+        else:
+            classifier = CategoryClassifier(read_mapping_rows(path))
+        _classifier_cache.clear()
+        _classifier_cache[key] = classifier
+    return classifier
+
+def classify_category(path: Union[str, Sequence[str], None]) -> Classification:
+    """Breadcrumb yolunu (veya tek kategori adını) (Shopify kategorisi, ürün tipi) çiftine çevir"""
+    return load_category_classifier().classify(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Breadcrumb yollarını Shopify kategorilerine eşle")
+    parser.add_argument('paths', nargs='+', help="Örn. 'Giyim > Üst Giyim > T-Shirt'")
+    parser.add_argument('--mapping', type=Path, default=CATEGORY_MAPPING_PATH, help="Eşleme tablosu (CSV)")
+    args = parser.parse_args()
+
+    category_classifier = load_category_classifier(args.mapping)
+    for category_path in args.paths:
+        shopify_category, product_type = category_classifier.classify(category_path)
+        print(f"{category_path} -> {shopify_category} | {product_type}")
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Devre kesici ayarları
+BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', '0.5'))
+BREAKER_MIN_REQUESTS = int(os.getenv('BREAKER_MIN_REQUESTS', '10'))
+BREAKER_WINDOW = float(os.getenv('BREAKER_WINDOW', '60'))  # Hata oranının ölçüldüğü pencere (sn)
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '120'))  # Açık kalma süresi (sn)
+
+class HostState:
+    """Tek bir host'un son sonuçları ve devre durumu"""
+
+    def __init__(self):
+        self.results: Deque[Tuple[float, bool]] = deque()
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+class CircuitBreaker:
+    """
+    Host başına devre kesici: pencere içindeki hata oranı eşiği aşınca istekler COOLDOWN boyunca
+    hiç gönderilmeden reddedilir; ardından tek bir deneme isteğine izin verilir (yarı açık),
+    deneme başarılıysa devre kapanır, değilse yeniden açılır (thread-safe)
+    """
+
+    def __init__(self, error_rate: float = BREAKER_ERROR_RATE, min_requests: int = BREAKER_MIN_REQUESTS,
+                 window: float = BREAKER_WINDOW, cooldown: float = BREAKER_COOLDOWN):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState()
+        return state
+
+    def is_open(self, host: str) -> bool:
+        """Devre açık ve bekleme süresi dolmamış mı (deneme hakkı tüketmez)"""
+        with self._lock:
+            state = self._hosts.get(host)
+            return (state is not None and state.opened_at is not None
+                    and (state.probing or time.monotonic() - state.opened_at < self.cooldown))
+
+    def allow(self, host: str) -> bool:
+        """İstek gönderilebilir mi; yarı açık durumda yalnızca ilk çağırana izin verilir"""
+        with self._lock:
+            state = self._state(host)
+            if state.opened_at is None:
+                return True
+            if state.probing or time.monotonic() - state.opened_at < self.cooldown:
+                return False
+            state.probing = True
+            logger.info(f"Devre yarı açık, deneme isteği gönderiliyor: {host}")
+            return True
+
+    def record(self, host: str, ok: bool) -> None:
+        """İstek sonucunu kaydet ve gerekirse devreyi aç/kapat"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(host)
+            if state.opened_at is not None:
+                if not state.probing:
+                    # Devre açılmadan önce gönderilmiş isteklerin sonuçları durumu değiştirmez
+                    return
+                state.probing = False
+                if ok:
+                    state.opened_at = None
+                    state.results.clear()
+                    logger.info(f"Devre kapandı: {host}")
+                else:
+                    state.opened_at = now
+                    logger.warning(f"Deneme isteği başarısız, devre yeniden açıldı: {host}")
+                return
+
+            state.results.append((now, ok))
+            while state.results and now - state.results[0][0] > self.window:
+                state.results.popleft()
+            failures = sum(1 for _, result in state.results if not result)
+            if len(state.results) >= self.min_requests and failures / len(state.results) >= self.error_rate:
+                state.opened_at = now
+                logger.warning(
+                    f"Devre açıldı: {host} ({failures}/{len(state.results)} hata, "
+                    f"{self.cooldown:.0f} sn istek gönderilmeyecek)"
+                )
+
+    def reset(self) -> None:
+        """Tüm host'ların geçmişini sil ve devreleri kapat"""
+        with self._lock:
+            self._hosts.clear()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Host başına anlık durum (izleme için)"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                host: {
+                    'state': 'closed' if state.opened_at is None
+                    else 'half-open' if state.probing or now - state.opened_at >= self.cooldown
+                    else 'open',
+                    'requests': len(state.results),
+                    'failures': sum(1 for _, result in state.results if not result),
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from sqlalchemy import select, func
+from bloom_filter import BloomFilter
+from database import get_db, init_db, Product
+from scraper import fetch_html
+from tracing import span
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tarayıcı ayarları
+CRAWLER_CONCURRENCY = int(os.getenv('CRAWLER_CONCURRENCY', '8'))
+CRAWLER_MAX_PAGES = int(os.getenv('CRAWLER_MAX_PAGES', '200'))
+CRAWLER_BLOOM_PATH = Path(os.getenv('CRAWLER_BLOOM_PATH', 'crawler_bloom.bin'))
+CRAWLER_BLOOM_CAPACITY = int(os.getenv('CRAWLER_BLOOM_CAPACITY', '1000000'))
+CRAWLER_BLOOM_ERROR_RATE = float(os.getenv('CRAWLER_BLOOM_ERROR_RATE', '0.001'))
+
+# Trendyol listeleme sayfalarında sayfa numarası parametresi
+PAGE_PARAM = 'pi'
+
+# Ürün linkleri "-p-<id>" ile biter; hem href'lerde hem gömülü JSON'da aranır
+PRODUCT_LINK_PATTERN = re.compile(r'["\']((?:https?:)?/[^"\'\s<>]*?-p-\d+[^"\'\s<>]*)["\']')
+PRODUCT_PATH_PATTERN = re.compile(r'-p-\d+$')
+
+def canonical_product_url(url: str) -> str:
+    """Ürün URL'sini sorgu ve parçalardan arındırarak karşılaştırılabilir hale getir"""
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path.rstrip('/'), '', ''))
+
+def listing_page_url(start_url: str, page: int) -> str:
+    """Listeleme URL'sinin belirtilen sayfasını oluştur"""
+    parts = urlsplit(start_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != PAGE_PARAM]
+    if page > 1:
+        query.append((PAGE_PARAM, str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+def extract_product_urls(html: str, page_url: str) -> List[str]:
+    """Listeleme sayfasındaki ürün linklerini aynı sitedekilerle sınırlı olarak sırayla döndür"""
+    html = html.replace('\\u002F', '/').replace('\\/', '/')
+    host = urlsplit(page_url).netloc.lower()
+    found: Dict[str, None] = {}
+    for match in PRODUCT_LINK_PATTERN.finditer(html):
+        url = canonical_product_url(urljoin(page_url, match.group(1).replace('&amp;', '&')))
+        parts = urlsplit(url)
+        if parts.netloc == host and PRODUCT_PATH_PATTERN.search(parts.path):
+            found[url] = None
+    return list(found)
+
+def crawl_listing(start_url: str, max_pages: int = CRAWLER_MAX_PAGES, concurrency: int = CRAWLER_CONCURRENCY,
+                  fetch: Callable[[str], Optional[str]] = fetch_html) -> List[str]:
+    """
+    Listeleme sayfalarını eşzamanlı gruplar halinde gez ve ürün URL'lerini topla
+    Hiç yeni ürün getirmeyen ilk sayfada durulur (son sayfa aşıldığında site ya boş
+    ya da son sayfayı tekrar döndürür). Çekilemeyen sayfalar bir kez yeniden denenir,
+    yine çekilemezse atlanır; bir gruptaki sayfaların hiçbiri çekilemezse tarama durur.
+    """
+    seen: Dict[str, None] = {}
+    page = 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while page <= max_pages:
+            pages = range(page, min(page + concurrency, max_pages + 1))
+            urls = [listing_page_url(start_url, number) for number in pages]
+            with span('crawler.pages', start_url=start_url, first=page, count=len(urls)):
+                htmls = list(executor.map(fetch, urls))
+                retry = [index for index, html in enumerate(htmls) if html is None]
+                if retry:
+                    for index, html in zip(retry, executor.map(fetch, [urls[index] for index in retry])):
+                        htmls[index] = html
+
+            finished = False
+            failed = 0
+            for url, html in zip(urls, htmls):
+                # Çekilemeyen sayfa son sayfa sayılmaz
+                if html is None:
+                    failed += 1
+                    logger.warning(f"Listeleme sayfası çekilemedi, atlanıyor: {url}")
+                    continue
+                links = extract_product_urls(html, url)
+                new_links = [link for link in links if link not in seen]
+                if not new_links:
+                    finished = True
+                    break
+                seen.update(dict.fromkeys(new_links))
+
+            logger.info(f"{start_url}: {page}-{pages[-1]}. sayfalar tarandı, toplam {len(seen)} ürün")
+            if finished:
+                break
+            if failed == len(urls):
+                logger.error(f"{start_url}: {page}-{pages[-1]}. sayfaların hiçbiri çekilemedi, tarama durduruluyor")
+                break
+            page += len(urls)
+
+    return list(seen)
+
+def build_known_filter(capacity: int = CRAWLER_BLOOM_CAPACITY,
+                       error_rate: float = CRAWLER_BLOOM_ERROR_RATE) -> BloomFilter:
+    """Kayıtlı ürünlerin kaynak URL'lerinden yeni bir Bloom filtresi oluştur"""
+    db = next(get_db())
+    try:
+        known = db.execute(select(func.count(Product.id)).where(Product.source_url.isnot(None))).scalar()
+        bloom = BloomFilter(max(capacity, known * 2), error_rate)
+        rows = db.execute(
+            select(Product.source_url).where(Product.source_url.isnot(None)).execution_options(yield_per=10000)
+        ).scalars()
+        bloom.update(canonical_product_url(url) for url in rows)
+    finally:
+        db.close()
+    logger.info(f"Bloom filtresi {known} kayıtlı üründen oluşturuldu ({bloom.num_bits // 8} bayt)")
+    return bloom
+
+def load_known_filter(path: Path = CRAWLER_BLOOM_PATH, rebuild: bool = False) -> BloomFilter:
+    """Kalıcı filtreyi yükle; yoksa, bozuksa veya kapasitesi dolduysa veritabanından yeniden oluştur"""
+    if not rebuild and path.exists():
+        try:
+            bloom = BloomFilter.load(path)
+            if not bloom.is_full:
+                return bloom
+            logger.info("Bloom filtresi kapasitesi doldu, yeniden oluşturuluyor")
+            return build_known_filter(capacity=bloom.capacity * 2)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Bloom filtresi okunamadı, yeniden oluşturuluyor: {str(e)}")
+    return build_known_filter()
+
+def feed_urls(urls: List[str], target: str) -> None:
+    """Yeni URL'leri scrape için iş kuyruğuna ya da doğrudan hatta gönder"""
+    if not urls or target == 'none':
+        return
+    if target == 'queue':
+        import work_queue
+        work_queue.enqueue_urls(urls)
+    elif target == 'pipeline':
+        from pipeline import run_pipeline
+        asyncio.run(run_pipeline(urls))
+
+def discover(start_urls: Iterable[str], max_pages: int = CRAWLER_MAX_PAGES,
+             concurrency: int = CRAWLER_CONCURRENCY, feed: str = 'queue',
+             bloom_path: Path = CRAWLER_BLOOM_PATH, rebuild_filter: bool = False,
+             fetch: Callable[[str], Optional[str]] = fetch_html) -> List[str]:
+    """
+    Listeleme sayfalarından yeni ürün URL'lerini bul ve scrape'e gönder
+    Gönderilen URL'ler filtreye eklenir, sonraki taramalarda tekrar gönderilmez
+    (feed='none' ile filtre değişmez); filtre yanlış pozitifleri nedeniyle yeni ürünlerin
+    çok küçük bir kısmı atlanabilir
+    """
+    bloom = load_known_filter(bloom_path, rebuild_filter)
+
+    found: Dict[str, None] = {}
+    for start_url in start_urls:
+        found.update(dict.fromkeys(crawl_listing(start_url, max_pages, concurrency, fetch)))
+
+    new_urls = [url for url in found if url not in bloom]
+    logger.info(f"{len(found)} ürün bulundu, {len(new_urls)} tanesi yeni")
+
+    feed_urls(new_urls, feed)
+    # Gönderilmeyen URL'ler filtreye eklenirse sonraki taramada yeni sayılmazlar
+    if feed != 'none':
+        bloom.update(new_urls)
+        bloom.save(bloom_path)
+    return new_urls
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trendyol kategori/arama sayfalarından yeni ürün URL'leri bul")
+    parser.add_argument('urls', nargs='+', help="Kategori veya arama listeleme URL'leri")
+    parser.add_argument('--max-pages', type=int, default=CRAWLER_MAX_PAGES)
+    parser.add_argument('--concurrency', type=int, default=CRAWLER_CONCURRENCY)
+    parser.add_argument('--feed', choices=['queue', 'pipeline', 'none'], default='queue',
+                        help="Yeni URL'lerin gönderileceği yer")
+    parser.add_argument('--output', help="Yeni URL'leri bu dosyaya da yaz")
+    parser.add_argument('--bloom-path', type=Path, default=CRAWLER_BLOOM_PATH)
+    parser.add_argument('--rebuild-filter', action='store_true', help="Filtreyi kayıtlı ürünlerden yeniden oluştur")
+    args = parser.parse_args()
+
+    init_db()
+    discovered = discover(args.urls, args.max_pages, args.concurrency, args.feed,
+                          args.bloom_path, args.rebuild_filter)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(discovered) + ('\n' if discovered else ''))
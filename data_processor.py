@@ -1,41 +1,36 @@
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional
 import logging
 import re
 import unicodedata
-from database import get_db, Product, Variant, PriceHistory
-from bs4 import BeautifulSoup
+from database import get_db, AsyncSessionLocal, Product, ProductImage, Variant, PriceHistory
+from category_classifier import load_category_classifier
+from pricing import compute_sell_prices
+from product_record import ProductRecord, records_to_frame
+from scraper import scrape_website
+from text_normalizer import normalize_text
+from tracing import traced
 from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import flag_modified
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def clean_text(text: str, max_length: int = 500) -> str:
-    if not isinstance(text, str):
-        text = str(text)
-    # HTML etiketlerini temizle
-    soup = BeautifulSoup(text, 'html.parser')
-    text = soup.get_text(separator=' ', strip=True)
-    text = ' '.join(text.split())
-    return text[:max_length-3] + '...' if len(text) > max_length else text
-
-def apply_price_markup(price: float, markup_percentage: float = 10.0) -> float:
-    """
-    Fiyata belirtilen yüzde kadar markup ekler
-    """
-    try:
-        return price * (1 + markup_percentage / 100)
-    except Exception as e:
-        logger.error(f"Markup uygulama hatası: {str(e)}")
-        return price
+    # HTML etiketlerini temizle (HTML içermeyen metinler için hızlı yol, tekrarlar önbellekten)
+    return normalize_text(text, max_length)
 
 def clean_price(price_str: str) -> float:
     """
-    Fiyat string'ini temizle ve float'a çevir
+    Fiyat string'ini temizle ve float'a çevir (markup uygulanmaz, bkz. pricing)
     Hata durumunda 0.0 döndür
     """
     try:
+        # Sayısal değerler zaten ayrıştırılmıştır; metne çevrilirse ondalık nokta binlik ayracı sanılır
+        if isinstance(price_str, (int, float)) and not isinstance(price_str, bool):
+            return float(price_str) if price_str > 0 else 0.0
         if not isinstance(price_str, str):
             price_str = str(price_str)
         # Binlik ayracı olan noktaları kaldır
@@ -45,9 +40,8 @@ def clean_price(price_str: str) -> float:
         # Sadece sayısal değerleri ve noktayı tut
         cleaned = re.sub(r'[^\d.]', '', cleaned)
         # Float'a çevir
-        base_price = float(cleaned) if cleaned else 0.0
-        # %10 markup uygula
-        return apply_price_markup(base_price) if base_price > 0 else 0.0
+        price = float(cleaned) if cleaned else 0.0
+        return price if price > 0 else 0.0
     except Exception as e:
         logger.warning(f"Fiyat temizleme hatası ({str(price_str)}): {str(e)}")
         return 0.0
@@ -85,131 +79,336 @@ def normalize_image_url(url: str) -> str:
     return url if url else None
 
 
-def process_data(raw_data: List[Dict[str, Any]], source_url: str) -> pd.DataFrame:
-    logger.info("Veri işleme başladı")
+# Shopify için gerekli sütunlar
+SHOPIFY_COLUMNS = [
+    'Handle', 'Title', 'Body (HTML)', 'Vendor', 'Product Category', 'Type', 'Tags',
+    'Published', 'Option1 Name', 'Option1 Value', 'Option2 Name',
+    'Option2 Value', 'Option3 Name', 'Option3 Value', 'Variant SKU',
+    'Variant Inventory Tracker', 'Variant Inventory Qty',
+    'Variant Inventory Policy', 'Variant Fulfillment Service',
+    'Variant Price', 'Variant Requires Shipping', 'Variant Taxable',
+    'Image Src', 'Image Position', 'Image Alt Text', 'Status',
+    'Database_ID', 'Properties'  # Özellikler için yeni sütun
+]
 
-    if not raw_data:
-        logger.warning("İşlenecek veri bulunamadı")
-        return pd.DataFrame()
+def detect_platform(source_url: str) -> str:
+    """Kaynak URL'den platform adını belirle"""
+    return 'trendyol' if source_url and 'trendyol.com' in source_url else 'hepsiburada'
 
-    # Shopify için gerekli sütunlar
-    columns = [
-        'Handle', 'Title', 'Body (HTML)', 'Vendor', 'Type', 'Tags',
-        'Published', 'Option1 Name', 'Option1 Value', 'Option2 Name',
-        'Option2 Value', 'Option3 Name', 'Option3 Value', 'Variant SKU',
-        'Variant Inventory Tracker', 'Variant Inventory Qty',
-        'Variant Inventory Policy', 'Variant Fulfillment Service',
-        'Variant Price', 'Variant Requires Shipping', 'Variant Taxable',
-        'Image Src', 'Image Position', 'Image Alt Text', 'Status',
-        'Database_ID', 'Properties'  # Özellikler için yeni sütun
-    ]
+def clean_price_series(prices: pd.Series) -> pd.Series:
+    """clean_price'ın vektörel karşılığı (aynı temizleme kuralları, sayısal değerler olduğu gibi)"""
+    is_text = prices.map(lambda value: isinstance(value, str))
+    cleaned = (
+        prices[is_text].astype(str)
+        .str.replace('.', '', regex=False)   # Binlik ayracı olan noktaları kaldır
+        .str.replace(',', '.', regex=False)  # Virgülü noktaya çevir
+        .str.replace(r'[^\d.]', '', regex=True)
+    )
+    parsed = pd.concat([
+        pd.to_numeric(cleaned, errors='coerce'),
+        pd.to_numeric(prices[~is_text], errors='coerce'),
+    ]).reindex(prices.index).fillna(0.0).astype(float)
+    return parsed.where(parsed > 0, 0.0)
+
+def clean_handle_series(titles: pd.Series) -> pd.Series:
+    """clean_handle'ın vektörel karşılığı"""
+    return (
+        titles.str.normalize('NFKD')
+        .str.encode('ascii', 'ignore')
+        .str.decode('utf-8')
+        .str.lower()
+        .str.replace(' ', '-', regex=False)
+        .str.replace(r'[^a-z0-9-]', '', regex=True)
+        .str.replace(r'-+', '-', regex=True)
+        .str.strip('-')
+    )
+
+def clean_text_series(texts: pd.Series, max_length: int = 500) -> pd.Series:
+    """clean_text'in vektörel karşılığı; HTML içeren değerler tek tek temizlenir"""
+    texts = texts.astype(str)
+    cleaned = texts.str.split().str.join(' ')
+    cleaned = cleaned.where(cleaned.str.len() <= max_length, cleaned.str[:max_length - 3] + '...')
+    has_markup = texts.str.contains('<', regex=False) | texts.str.contains('&', regex=False)
+    if has_markup.any():
+        cleaned[has_markup] = texts[has_markup].map(lambda text: clean_text(text, max_length))
+    return cleaned
+
+@traced()
+def prepare_items(raw_data: List[ProductRecord]) -> pd.DataFrame:
+    """Ham ürünleri doğrula ve ürün başına bir satırlık ara tabloya dönüştür"""
+    items = records_to_frame(raw_data)
+    if items.empty:
+        return items
 
-    processed_rows = []
-    for item in raw_data:
-        title = item.get('title', '')
-        if not title:
-            logger.warning("Başlık bulunamadı, ürün atlanıyor")
-            continue
+    missing_title = items['title'] == ''
+    if missing_title.any():
+        logger.warning("Başlık bulunamadı, %d ürün atlanıyor", int(missing_title.sum()))
+    items = items[~missing_title].copy()
 
-        handle = clean_handle(title)
-        base_price = clean_price(str(item.get('price', '0')))
+    items['price'] = clean_price_series(items['price'])
+    invalid_price = items['price'] <= 0
+    if invalid_price.any():
+        logger.warning("Geçersiz fiyat, %d ürün atlanıyor", int(invalid_price.sum()))
+    items = items[~invalid_price].copy()
 
-        if base_price <= 0:
-            logger.warning("Geçersiz fiyat: %s, ürün atlanıyor", str(base_price))
-            continue
+    items['sell_price'] = compute_sell_prices(items['price'], items['category'])
+    items['handle'] = clean_handle_series(items['title'])
+    items['properties_html'] = items['properties'].map(format_properties_for_html)
+    return items.reset_index(drop=True)
 
-        # Ürün özellikleri
-        properties = item.get('properties', {})
-        properties_html = format_properties_for_html(properties)
+def category_paths(items: pd.DataFrame) -> pd.Series:
+    """Sınıflandırılacak yollar: breadcrumb yolu yoksa (eski kayıtlar) kategori adı kullanılır"""
+    categories = items['category'] if 'category' in items else pd.Series(None, index=items.index, dtype=object)
+    if 'category_path' not in items:
+        return categories
+    return items['category_path'].where(items['category_path'].notna(), categories)
+
+@traced()
+def build_shopify_frame(items: pd.DataFrame, product_ids: Optional[List[Any]] = None) -> pd.DataFrame:
+    """
+    Ara tablodan Shopify DataFrame'ini sütun bazında oluştur (veritabanına dokunmaz)
+    product_ids verilirse kaydı başarısız olan ürünler (None) çıktıdan çıkarılır
+    """
+    if items.empty:
+        return pd.DataFrame(columns=SHOPIFY_COLUMNS)
 
-        # Önce Product kaydını oluştur ve ID'yi al
-        db = next(get_db())
+    database_ids = pd.Series('', index=items.index, dtype=object)
+    if product_ids is not None:
+        database_ids = pd.Series(product_ids, index=items.index, dtype=object)
+        items = items[database_ids.notna()]
+
+    # Görseli olmayan ürünler için satır üretilmez
+    items = items[items['image_urls'].str.len() > 0]
+    if items.empty:
+        return pd.DataFrame(columns=SHOPIFY_COLUMNS)
+
+    # Görsel satırlarını tek adımda aç
+    images = items['image_urls'].explode()
+    positions = images.groupby(level=0).cumcount() + 1
+    sources = images.map(normalize_image_url)
+    is_main = positions == 1
+    keep = is_main | sources.fillna('').astype(bool)
+    images, positions, sources, is_main = images[keep], positions[keep], sources[keep], is_main[keep]
+
+    owner = images.index
+    alt_text = clean_text_series(items['title'], 255).reindex(owner)
+    tags = clean_text_series(items['title'].str.replace(' ', ', ', regex=False).str.lower(), 255)
+
+    def main_only(values: Any) -> pd.Series:
+        if isinstance(values, pd.Series):
+            values = values.reindex(owner)
+        return pd.Series(values, index=owner, dtype=object).where(is_main, '')
+
+    frame = pd.DataFrame({column: '' for column in SHOPIFY_COLUMNS}, index=owner)
+    frame['Handle'] = items['handle'].reindex(owner)
+    frame['Title'] = main_only(items['title'])
+    frame['Body (HTML)'] = main_only(items['properties_html'])
+    frame['Vendor'] = main_only(items['brand'])
+    categories = load_category_classifier().classify_series(category_paths(items))
+    frame['Product Category'] = main_only(categories['Product Category'])
+    frame['Type'] = main_only(categories['Type'])
+    frame['Tags'] = main_only(tags)
+    frame['Published'] = main_only('TRUE')
+    frame['Option1 Name'] = main_only('Title')
+    frame['Option1 Value'] = main_only('Default Title')
+    frame['Variant SKU'] = main_only(items['handle'])
+    frame['Variant Inventory Tracker'] = main_only('shopify')
+    frame['Variant Inventory Qty'] = main_only('100')
+    frame['Variant Inventory Policy'] = main_only('deny')
+    frame['Variant Fulfillment Service'] = main_only('manual')
+    frame['Variant Price'] = main_only(items['sell_price'].map(str))
+    frame['Variant Requires Shipping'] = main_only('TRUE')
+    frame['Variant Taxable'] = main_only('TRUE')
+    frame['Image Src'] = sources
+    frame['Image Position'] = positions.astype(str)
+    frame['Image Alt Text'] = alt_text.where(is_main, alt_text + ' - ' + positions.astype(str))
+    frame['Status'] = main_only('active')
+    frame['Database_ID'] = database_ids.reindex(owner)
+    frame['Properties'] = main_only(items['properties_html'])
+
+    return frame.reset_index(drop=True)
+
+def transform_data(raw_data: List[ProductRecord]) -> pd.DataFrame:
+    """Ham veriyi veritabanına yazmadan Shopify DataFrame'ine dönüştür"""
+    return build_shopify_frame(prepare_items(raw_data))
+
+def build_image_models(image_urls: Iterable[str]) -> List[ProductImage]:
+    """Görsel listesini sıralı görsel kayıtlarına çevir (1'den başlayan pozisyonlar)"""
+    return [ProductImage(image_url=url, position=position) for position, url in enumerate(image_urls, 1) if url]
+
+def build_product_models(item: Dict[str, Any], source_url: Optional[str] = None) -> Product:
+    """Ürün, varyant ve fiyat geçmişi kayıtlarını tek bir nesne grafiği olarak oluştur"""
+    # Ürün kendi kaynak URL'sini taşıyorsa (toplu işlemler) o kullanılır
+    source_url = item.get('source_url') or source_url
+    return Product(
+        title=item['title'],
+        description=item['properties_html'],  # Açıklama yerine özellikleri kullan
+        image_url=item['image_urls'][0] if item['image_urls'] else None,
+        source_url=source_url,
+        stock_status=item['stock_status'],
+        category=item.get('category'),
+        category_path=item.get('category_path'),
+        source_price=item['price'],
+        variants=[Variant(sku=item['handle'], current_price=item['sell_price'], stock=100)],
+        images=build_image_models(item['image_urls']),
+        price_history=[PriceHistory(
+            price=item['price'],
+            platform=detect_platform(source_url),
+            tracked_at=datetime.utcnow()
+        )]
+    )
+
+@traced()
+def persist_products(items: pd.DataFrame, source_url: Optional[str] = None) -> List[Optional[int]]:
+    """
+    Ürünleri tek işlemde kaydet ve ID'lerini döndür
+    Toplu ekleme bir savepoint içinde denenir; başarısız olursa her ürün kendi savepoint'inde
+    yeniden eklenir, böylece yalnızca hatalı ürünün ID'si None olur
+    """
+    products = [build_product_models(item, source_url) for item in items.to_dict('records')]
+    db = next(get_db())
+    try:
         try:
-            product = Product(
-                title=title,
-                description=properties_html,  # Açıklama yerine özellikleri kullan
-                image_url=item.get('image_urls', [''])[0] if item.get('image_urls') else None,
-                source_url=source_url,
-                stock_status=item.get('stock_status', True)
-            )
-            db.add(product)
-            db.flush()  # ID'yi almak için flush
-            product_id = product.id
-
-            # Variant kaydını oluştur
-            variant = Variant(
-                product_id=product_id,
-                sku=handle,
-                current_price=base_price,
-                stock=100
-            )
-            db.add(variant)
-
-            # Fiyat geçmişi kaydı
-            platform = 'trendyol' if 'trendyol.com' in source_url else 'hepsiburada'
-            price_history = PriceHistory(
-                product_id=product_id,
-                price=base_price,
-                platform=platform,
-                tracked_at=datetime.utcnow()
-            )
-            db.add(price_history)
-            db.commit()
-
-            # DataFrame için temel satırı oluştur
-            base_row = dict.fromkeys(columns, '')
-            base_row.update({
-                'Handle': handle,
-                'Title': title,
-                'Body (HTML)': properties_html,  # Açıklama yerine özellikleri kullan
-                'Vendor': item.get('brand', ''),
-                'Type': 'Clothing',
-                'Tags': clean_text(title.replace(' ', ', ').lower(), 255),
-                'Published': 'TRUE',
-                'Option1 Name': 'Title',
-                'Option1 Value': 'Default Title',
-                'Variant SKU': handle,
-                'Variant Inventory Tracker': 'shopify',
-                'Variant Inventory Qty': '100',
-                'Variant Inventory Policy': 'deny',
-                'Variant Fulfillment Service': 'manual',
-                'Variant Price': str(base_price),
-                'Variant Requires Shipping': 'TRUE',
-                'Variant Taxable': 'TRUE',
-                'Status': 'active',
-                'Database_ID': product_id,  # Veritabanı ID'sini sakla
-                'Properties': properties_html  # Özellikleri ayrı bir sütunda sakla
-            })
-
-            # Ana görsel
-            if item.get('image_urls'):
-                base_row.update({
-                    'Image Src': normalize_image_url(item['image_urls'][0]),  # URL'yi normalize et
-                    'Image Position': '1',
-                    'Image Alt Text': clean_text(title, 255)
-                })
-                processed_rows.append(base_row)
-
-                # Ek görseller için satırlar ekle
-                for img_index, img_url in enumerate(item['image_urls'][1:], start=2):
-                    img_row = dict.fromkeys(columns, '')
-                    normalized_url = normalize_image_url(img_url)  # URL'yi normalize et
-                    if normalized_url:  # Sadece geçerli URL'leri ekle
-                        img_row.update({
-                            'Handle': handle,
-                            'Image Src': normalized_url,
-                            'Image Position': str(img_index),
-                            'Image Alt Text': f"{clean_text(title, 255)} - {img_index}",
-                            'Database_ID': product_id
-                        })
-                        processed_rows.append(img_row)
+            with db.begin_nested():
+                db.add_all(products)
+            product_ids = [product.id for product in products]
+        except Exception as e:
+            logger.warning(f"Toplu kayıt başarısız, ürünler tek tek kaydediliyor: {str(e)}")
+            product_ids = []
+            for product in products:
+                try:
+                    with db.begin_nested():
+                        db.add(product)
+                    product_ids.append(product.id)
+                except Exception as e:
+                    logger.error(f"Ürün kayıt hatası ({product.source_url}): {str(e)}")
+                    product_ids.append(None)
+        db.commit()
+        return product_ids
+    except Exception as e:
+        logger.error(f"Ürün kayıt hatası: {str(e)}")
+        db.rollback()
+        return [None] * len(products)
+    finally:
+        db.close()
 
+@traced()
+async def persist_products_async(items: pd.DataFrame, source_url: Optional[str] = None) -> List[Optional[int]]:
+    """persist_products'ın async karşılığı"""
+    products = [build_product_models(item, source_url) for item in items.to_dict('records')]
+    async with AsyncSessionLocal() as db:
+        try:
+            try:
+                # Toplu ekleme: SQLAlchemy INSERT'leri gruplayıp ID'leri tek seferde döndürür
+                async with db.begin_nested():
+                    db.add_all(products)
+                product_ids = [product.id for product in products]
+            except Exception as e:
+                logger.warning(f"Toplu kayıt başarısız, ürünler tek tek kaydediliyor: {str(e)}")
+                product_ids = []
+                for product in products:
+                    try:
+                        async with db.begin_nested():
+                            db.add(product)
+                        product_ids.append(product.id)
+                    except Exception as e:
+                        logger.error(f"Ürün kayıt hatası ({product.source_url}): {str(e)}")
+                        product_ids.append(None)
+            await db.commit()
+            return product_ids
         except Exception as e:
             logger.error(f"Ürün kayıt hatası: {str(e)}")
-            db.rollback()
-        finally:
-            db.close()
+            await db.rollback()
+            return [None] * len(products)
+
+def apply_product_content(product: Product, data: ProductRecord) -> bool:
+    """
+    Ürünün içerik alanlarını scrape sonucundan güncelle; herhangi bir alan değiştiyse True döner
+    Görsel listesi değişirse görsel kayıtları yenilenir (async oturumda images önceden yüklenmiş olmalı)
+    """
+    product.title = data.get('title', product.title)
+    product.description = data.get('description', product.description)
+    product.image_url = (data.get('image_urls') or [None])[0] or product.image_url
+
+    # İlk görsel dışındaki değişiklikler de delta dışa aktarımda görünsün
+    image_urls = [url for url in data.get('image_urls', ()) if url]
+    images_changed = bool(image_urls) and image_urls != [
+        image.image_url for image in sorted(product.images, key=lambda image: image.position or 0)
+    ]
+    if images_changed:
+        product.images = build_image_models(image_urls)
+
+    # Stok durumunu kontrol et
+    if 'stock_status' in data:
+        product.stock_status = data['stock_status']
+    if 'category' in data:
+        product.category = data['category']
+    if 'category_path' in data:
+        product.category_path = data['category_path']
+
+    return images_changed or any(
+        inspect(product).attrs[field].history.has_changes()
+        for field in ('title', 'description', 'image_url', 'stock_status', 'category', 'category_path')
+    )
+
+def apply_scraped_update(db: Any, product: Product, data: ProductRecord) -> bool:
+    """
+    Kayıtlı ürünü yeni scrape sonucuyla güncelle ve fiyat geçmişine ekle
+    Kaynak fiyat saklanır; satış fiyatları pricing.reprice_catalog ile kurallardan hesaplanır.
+    Senkron Session ve AsyncSession ile çalışır (commit çağırana aittir); fiyat geçersizse False döner
+    """
+    # Fiyat güncelleme
+    new_price = clean_price(data.get('price', 0))
+    if new_price <= 0:
+        return False
+    product.source_price = new_price
+
+    # Fiyat geçmişine ekle
+    db.add(PriceHistory(
+        product_id=product.id,
+        price=new_price,
+        platform=detect_platform(product.source_url),
+        tracked_at=datetime.utcnow()
+    ))
+
+    # İçerik değişmediyse updated_at korunur (delta dışa aktarım buna dayanır)
+    if not apply_product_content(product, data):
+        flag_modified(product, 'updated_at')
+    product.last_checked = datetime.utcnow()
+    return True
+
+@traced()
+def process_data(raw_data: List[ProductRecord], source_url: str) -> pd.DataFrame:
+    logger.info("Veri işleme başladı")
+
+    if not raw_data:
+        logger.warning("İşlenecek veri bulunamadı")
+        return pd.DataFrame()
+
+    items = prepare_items(raw_data)
+    if items.empty:
+        return pd.DataFrame(columns=SHOPIFY_COLUMNS)
+
+    product_ids = persist_products(items, source_url)
+    return build_shopify_frame(items, product_ids)
+
+@traced()
+async def process_data_async(raw_data: List[ProductRecord], source_url: str) -> pd.DataFrame:
+    """process_data'nın async karşılığı: ürünleri tek işlemde toplu olarak kaydeder, hatalı ürün yalnızca kendisini düşürür"""
+    logger.info("Veri işleme başladı (async)")
+
+    if not raw_data:
+        logger.warning("İşlenecek veri bulunamadı")
+        return pd.DataFrame()
+
+    items = prepare_items(raw_data)
+    if items.empty:
+        return pd.DataFrame(columns=SHOPIFY_COLUMNS)
+
+    product_ids = await persist_products_async(items, source_url)
+    return build_shopify_frame(items, product_ids)
 
-    # DataFrame oluştur
-    df = pd.DataFrame(processed_rows, columns=columns)
-    return df
\ No newline at end of file
+async def scrape_and_process(url: str) -> pd.DataFrame:
+    """URL'yi çek, işle ve kaydet; tüm adımlar aynı event loop üzerinde çalışır"""
+    raw_data = await scrape_website(url)
+    return await process_data_async(raw_data, url)
@@ -1,12 +1,14 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 from datetime import datetime
 import logging
 import time
-from typing import Generator
+from typing import Generator, AsyncGenerator, Dict, Any, List, Tuple
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +33,48 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async sürücü eşlemesi (senkron sürücü -> asyncio sürücüsü)
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+def build_async_url(database_url: str) -> Tuple[str, Dict[str, Any]]:
+    """Senkron veritabanı URL'sini async sürücü URL'sine ve bağlantı argümanlarına çevir"""
+    url = make_url(database_url)
+    connect_args: Dict[str, Any] = {}
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+
+    if drivername == 'postgresql+asyncpg':
+        # asyncpg 'sslmode' parametresini tanımaz, 'ssl' olarak iletilmeli
+        query = dict(url.query)
+        sslmode = query.pop('sslmode', None)
+        if sslmode:
+            connect_args['ssl'] = sslmode
+        url = url.set(query=query)
+
+    return url.set(drivername=drivername).render_as_string(hide_password=False), connect_args
+
+def create_async_db_engine(database_url: str):
+    """
+    Havuzsuz async engine oluştur
+    Async kod her çağrıda asyncio.run() ile yeni bir event loop'ta çalışır; asyncpg bağlantıları
+    açıldıkları loop'a bağlı kaldığından havuzda tutulmaz, oturum kapanınca bağlantı da kapanır.
+    """
+    async_url, connect_args = build_async_url(database_url)
+    return create_async_engine(
+        async_url,
+        poolclass=NullPool,
+        connect_args=connect_args
+    )
+
+# Async engine (scrape -> işle -> kaydet hattı tek event loop üzerinde çalışır)
+async_engine = create_async_db_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -41,6 +85,9 @@ class Product(Base):
     image_url = Column(Text)
     source_url = Column(Text)
     stock_status = Column(Boolean, default=True)  # Stock status field added
+    category = Column(String(100), nullable=True)  # Kaynak sitedeki kategori (fiyat kuralları için)
+    category_path = Column(Text, nullable=True)  # Tam breadcrumb yolu (Shopify kategorisi için)
+    source_price = Column(Float, nullable=True)  # Markup uygulanmamış son kaynak fiyatı
     last_checked = Column(DateTime, default=datetime.utcnow)  # Last checked field added
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -54,7 +101,7 @@ class Variant(Base):
     __tablename__ = "variants"
 
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True)
     sku = Column(Text, nullable=True)
     size = Column(String(50), nullable=True)
     color = Column(String(50), nullable=True)
@@ -98,12 +145,129 @@ class CompetitorPrice(Base):
 
     product = relationship("Product", back_populates="competitor_prices")
 
+class ExportWatermark(Base):
+    __tablename__ = "export_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False, unique=True)  # Dışa aktarım akışının adı (örn. shopify)
+    exported_at = Column(DateTime, nullable=False)  # Son başarılı dışa aktarımın başlangıç zamanı
+    row_count = Column(Integer, default=0)
+
+class ScrapeJob(Base):
+    __tablename__ = "scrape_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default='pending', index=True)  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # Yeniden deneme zamanı
+    lease_token = Column(String(64), nullable=True, index=True)  # Talep eden işçinin kira anahtarı
+    leased_by = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ImageHash(Base):
+    __tablename__ = "image_hashes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(Text, nullable=False, unique=True)  # Kanonik CDN görsel URL'si
+    dhash = Column(String(16), nullable=False)  # 64 bitlik fark hash'i (hex)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class UrlFailure(Base):
+    __tablename__ = "url_failures"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(Text, nullable=False, unique=True)  # Ürünün kayıtlı kaynak URL'si
+    failure_count = Column(Integer, nullable=False, default=0)  # Art arda başarısız deneme sayısı
+    last_error = Column(Text, nullable=True)
+    first_failed_at = Column(DateTime, default=datetime.utcnow)
+    last_failed_at = Column(DateTime, default=datetime.utcnow)
+    next_check_at = Column(DateTime, nullable=False, index=True)  # Bu zamana kadar yeniden denenmez
+    dead = Column(Boolean, default=False)  # Yayından kalkmış sayıldı (stok dışı işaretlendi)
+
+def add_missing_columns(bind) -> None:
+    """create_all mevcut tablolara sonradan eklenen sütunları eklemez; boş bırakılabilir olanları ekle"""
+    inspector = inspect(bind)
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            statements.append(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+    if statements:
+        run_ddl(bind, statements)
+        logger.info(f"Eksik sütunlar eklendi: {statements}")
+
+def run_ddl(bind, statements: List[str]) -> None:
+    """Engine verilirse kendi işlemini açar; bağlantı verilirse (async run_sync) mevcut işlemi kullanır"""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    else:
+        for statement in statements:
+            bind.execute(text(statement))
+
+# Tam metin arama: PostgreSQL'de ifade üzerinde GIN indeksi, SQLite'ta FTS5 tablosu
+SEARCH_TS_CONFIG = os.getenv('SEARCH_TS_CONFIG', 'turkish')
+# Sorgular indeksin kullanılması için bu ifadeyi birebir aynı yazmalıdır
+SEARCH_DOCUMENT_SQL = (
+    f"to_tsvector('{SEARCH_TS_CONFIG}', coalesce(title, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(category, ''))"
+)
+SQLITE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, description, category)
+        VALUES ('delete', old.id, old.title, old.description, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF title, description, category ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, description, category)
+        VALUES ('delete', old.id, old.title, old.description, old.category);
+        INSERT INTO products_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, new.category);
+    END""",
+]
+
+def init_search_index(bind) -> None:
+    """Ürün arama indeksini oluştur (tekrar çağrılabilir); diğer veritabanlarında indeks yoktur"""
+    dialect = bind.dialect.name
+    # Arama sonuçlarının fiyatı ürün başına varyantlardan okunur; eski tablolarda indeks eksik olabilir
+    run_ddl(bind, ["CREATE INDEX IF NOT EXISTS ix_variants_product_id ON variants (product_id)"])
+    if dialect == 'postgresql':
+        run_ddl(bind, [f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN ({SEARCH_DOCUMENT_SQL})"])
+    elif dialect == 'sqlite':
+        existed = inspect(bind).has_table('products_fts')
+        statements = [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+            "title, description, category, content='products', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')",
+            *SQLITE_FTS_TRIGGERS,
+        ]
+        if not existed:
+            # Mevcut ürünler tek seferde indekslenir, sonrası tetikleyicilerle güncel kalır
+            statements.append("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        run_ddl(bind, statements)
+
 def init_db(max_retries: int = 3, retry_delay: int = 5) -> None:
     """Veritabanı tablolarını oluştur"""
     for attempt in range(max_retries):
         try:
             logger.info(f"Veritabanı tabloları oluşturuluyor (Deneme {attempt + 1}/{max_retries})...")
             Base.metadata.create_all(bind=engine)
+            add_missing_columns(engine)
+            init_search_index(engine)
             logger.info("Veritabanı tabloları başarıyla oluşturuldu!")
             return
         except Exception as e:
@@ -115,6 +279,14 @@ def init_db(max_retries: int = 3, retry_delay: int = 5) -> None:
                 logger.error(f"Veritabanı oluşturma başarısız oldu: {str(e)}")
                 raise
 
+async def init_async_db() -> None:
+    """Veritabanı tablolarını async engine üzerinden oluştur"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+        await conn.run_sync(init_search_index)
+    logger.info("Veritabanı tabloları (async) başarıyla oluşturuldu!")
+
 def get_db() -> Generator:
     """Veritabanı oturumu oluştur ve yönet"""
     db = SessionLocal()
@@ -128,4 +300,19 @@ def get_db() -> Generator:
         try:
             db.close()
         except Exception as e:
-            logger.error(f"Veritabanı oturumu kapatma hatası: {str(e)}")
\ No newline at end of file
+            logger.error(f"Veritabanı oturumu kapatma hatası: {str(e)}")
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async veritabanı oturumu oluştur ve yönet"""
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    except Exception as e:
+        logger.error(f"Async veritabanı oturum hatası: {str(e)}")
+        await db.rollback()
+        raise
+    finally:
+        try:
+            await db.close()
+        except Exception as e:
+            logger.error(f"Async veritabanı oturumu kapatma hatası: {str(e)}")
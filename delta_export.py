@@ -0,0 +1,176 @@
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import pandas as pd
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, selectinload
+from database import get_db, Product, PriceHistory, ProductImage, ExportWatermark
+from data_processor import SHOPIFY_COLUMNS, build_shopify_frame, clean_handle_series
+from pricing import compute_sell_prices
+from utils import export_data
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_NAME = 'shopify'
+
+def get_export_watermark(db: Session, name: str = DEFAULT_EXPORT_NAME) -> Optional[datetime]:
+    """Son başarılı dışa aktarımın zamanını getir"""
+    watermark = db.execute(
+        select(ExportWatermark).where(ExportWatermark.name == name)
+    ).scalar_one_or_none()
+    return watermark.exported_at if watermark else None
+
+def set_export_watermark(db: Session, exported_at: datetime, row_count: int,
+                         name: str = DEFAULT_EXPORT_NAME) -> None:
+    """Dışa aktarım zamanını kaydet"""
+    watermark = db.execute(
+        select(ExportWatermark).where(ExportWatermark.name == name)
+    ).scalar_one_or_none()
+    if watermark is None:
+        watermark = ExportWatermark(name=name)
+        db.add(watermark)
+    watermark.exported_at = exported_at
+    watermark.row_count = row_count
+
+def latest_prices(db: Session, product_ids: List[int], before: Optional[datetime] = None) -> Dict[int, float]:
+    """Her ürün için (isteğe bağlı olarak belirli bir zamandan önceki) en güncel fiyatı getir"""
+    if not product_ids:
+        return {}
+
+    ranked = select(
+        PriceHistory.product_id,
+        PriceHistory.price,
+        func.row_number().over(
+            partition_by=PriceHistory.product_id,
+            order_by=(PriceHistory.tracked_at.desc(), PriceHistory.id.desc())
+        ).label('rank')
+    ).where(PriceHistory.product_id.in_(product_ids))
+    if before is not None:
+        ranked = ranked.where(PriceHistory.tracked_at <= before)
+    ranked = ranked.subquery()
+
+    rows = db.execute(select(ranked.c.product_id, ranked.c.price).where(ranked.c.rank == 1))
+    return {product_id: price for product_id, price in rows}
+
+def find_changed_product_ids(db: Session, since: Optional[datetime]) -> List[int]:
+    """Watermark'tan sonra başlığı, fiyatı, stoğu veya görselleri değişen ürünleri bul"""
+    if since is None:
+        # İlk dışa aktarım: tüm katalog
+        return list(db.execute(select(Product.id).order_by(Product.id)).scalars())
+
+    changed: Set[int] = set(db.execute(
+        select(Product.id).where(Product.updated_at > since)
+    ).scalars())
+    changed.update(db.execute(
+        select(ProductImage.product_id).where(ProductImage.created_at > since).distinct()
+    ).scalars())
+
+    # Yenileme her seferinde fiyat geçmişine satır ekler; yalnızca fiyatı gerçekten değişenleri al
+    priced = list(db.execute(
+        select(PriceHistory.product_id).where(PriceHistory.tracked_at > since).distinct()
+    ).scalars())
+    current = latest_prices(db, priced)
+    previous = latest_prices(db, priced, before=since)
+    changed.update(
+        product_id for product_id in priced
+        if previous.get(product_id) != current.get(product_id)
+    )
+
+    return sorted(changed)
+
+def build_delta_frame(db: Session, product_ids: List[int]) -> pd.DataFrame:
+    """Değişen ürünleri process_data ile aynı Shopify sütun düzeninde oluştur"""
+    if not product_ids:
+        return pd.DataFrame(columns=SHOPIFY_COLUMNS)
+
+    products = db.execute(
+        select(Product).where(Product.id.in_(product_ids)).order_by(Product.id)
+        # Yedek fiyat için varyantlar tek ek sorguda yüklenir (ürün başına lazy load yerine)
+        .options(selectinload(Product.variants))
+    ).scalars().all()
+
+    image_rows = db.execute(
+        select(ProductImage.product_id, ProductImage.image_url)
+        .where(ProductImage.product_id.in_(product_ids))
+        .order_by(ProductImage.product_id, ProductImage.position)
+    )
+    images: Dict[int, List[str]] = {}
+    for product_id, image_url in image_rows:
+        images.setdefault(product_id, []).append(image_url)
+
+    items = pd.DataFrame({
+        'title': [product.title for product in products],
+        'price': [product.source_price for product in products],
+        'category': [product.category for product in products],
+        'category_path': [product.category_path for product in products],
+        'brand': [''] * len(products),
+        'image_urls': [
+            images.get(product.id) or ([product.image_url] if product.image_url else [])
+            for product in products
+        ],
+        'properties_html': [product.description or '' for product in products],
+        'stock_status': [bool(product.stock_status) for product in products],
+    })
+    # Satış fiyatı güncel kurallarla kaynak fiyattan hesaplanır; kaynak fiyatı olmayan
+    # eski kayıtlarda varyanttaki (markup'lı) fiyat kullanılır
+    fallback_prices = pd.Series([
+        product.variants[0].current_price if product.variants else 0.0 for product in products
+    ], index=items.index, dtype=float)
+    items['sell_price'] = compute_sell_prices(items['price'], items['category']).where(
+        items['price'].notna(), fallback_prices)
+    items['handle'] = clean_handle_series(items['title'])
+
+    frame = build_shopify_frame(items, [product.id for product in products])
+
+    # Stokta olmayan ürünler Shopify'da satışa kapatılsın
+    out_of_stock_ids = {product.id for product in products if not product.stock_status}
+    if out_of_stock_ids:
+        out_of_stock = frame['Database_ID'].isin(out_of_stock_ids) & (frame['Image Position'] == '1')
+        frame.loc[out_of_stock, 'Variant Inventory Qty'] = '0'
+
+    return frame
+
+def export_delta(format_type: str = 'csv', name: str = DEFAULT_EXPORT_NAME,
+                 full: bool = False, commit: bool = True) -> Tuple[bytes, int]:
+    """
+    Son dışa aktarımdan beri değişen ürünleri dışa aktarır
+    (içerik, ürün sayısı) döndürür; commit=True ise watermark ilerletilir
+    """
+    db = next(get_db())
+    try:
+        # Watermark sorgudan önce alınır, böylece dışa aktarım sırasında değişenler kaçmaz
+        started_at = datetime.utcnow()
+        since = None if full else get_export_watermark(db, name)
+        product_ids = find_changed_product_ids(db, since)
+        logger.info(f"Değişen ürün sayısı: {len(product_ids)} (watermark: {since})")
+
+        frame = build_delta_frame(db, product_ids)
+        content = export_data(frame, format_type)
+
+        if commit:
+            set_export_watermark(db, started_at, len(product_ids), name)
+            db.commit()
+        return content, len(product_ids)
+    except Exception as e:
+        logger.error(f"Delta dışa aktarım hatası: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Son dışa aktarımdan beri değişen ürünleri dışa aktar")
+    parser.add_argument('output', help="Çıktı dosyası")
+    parser.add_argument('--format', default='csv', choices=['csv', 'excel', 'parquet', 'arrow', 'jsonl'])
+    parser.add_argument('--name', default=DEFAULT_EXPORT_NAME, help="Watermark adı")
+    parser.add_argument('--full', action='store_true', help="Watermark'ı yok say, tüm kataloğu aktar")
+    parser.add_argument('--dry-run', action='store_true', help="Watermark'ı ilerletme")
+    args = parser.parse_args()
+
+    content, count = export_delta(args.format, args.name, full=args.full, commit=not args.dry_run)
+    with open(args.output, 'wb') as f:
+        f.write(content)
+    logger.info(f"{count} ürün {args.output} dosyasına aktarıldı")
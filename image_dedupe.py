@@ -0,0 +1,116 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from PIL import Image
+from sqlalchemy import select
+from database import get_db, ImageHash
+from product_record import ProductRecord
+from scraper import CDN_HOST
+from tracing import span
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Görsel benzerlik ayarları (açma/kapama bayrağı scraper.IMAGE_PHASH_ENABLED)
+IMAGE_PHASH_MAX_DISTANCE = int(os.getenv('IMAGE_PHASH_MAX_DISTANCE', '6'))
+IMAGE_PHASH_WORKERS = int(os.getenv('IMAGE_PHASH_WORKERS', '8'))
+
+# Hash için CDN'den istenen küçük görsel boyutu (tam boyut indirilmez)
+THUMBNAIL_SIZE = 64
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+def thumbnail_url(url: str) -> str:
+    """CDN görselinin küçük boyutlu kopyasının URL'si; CDN dışı URL'ler olduğu gibi döner"""
+    parts = urlsplit(url)
+    if parts.netloc.lower() != CDN_HOST:
+        return url
+    return urlunsplit(('https', CDN_HOST, f"/mnresize/{THUMBNAIL_SIZE}/{THUMBNAIL_SIZE}{parts.path}", '', ''))
+
+def difference_hash(data: bytes) -> int:
+    """64 bitlik fark hash'i (dHash): yan yana piksellerin parlaklık karşılaştırması"""
+    with Image.open(BytesIO(data)) as image:
+        pixels = list(image.convert('L').resize((HASH_WIDTH, HASH_HEIGHT), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(HASH_HEIGHT):
+        offset = row * HASH_WIDTH
+        for col in range(HASH_WIDTH - 1):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def fetch_image_hash(url: str) -> Optional[int]:
+    """Görselin küçük kopyasını indirip hash'ini hesapla; hata durumunda None"""
+    try:
+        response = requests.get(thumbnail_url(url), timeout=10)
+        response.raise_for_status()
+        return difference_hash(response.content)
+    except Exception as e:
+        logger.warning(f"Görsel hash'i hesaplanamadı ({url}): {str(e)}")
+        return None
+
+def image_hashes(urls: Iterable[str], workers: int = IMAGE_PHASH_WORKERS) -> Dict[str, int]:
+    """
+    URL'lerin hash'lerini getir: kayıtlı olanlar tek sorguyla okunur, eksikler eşzamanlı
+    hesaplanıp kaydedilir (CDN görselleri değişmediği için hash'ler süresizdir)
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    hashes: Dict[str, int] = {}
+    db = next(get_db())
+    try:
+        hashes = {
+            row.url: int(row.dhash, 16)
+            for row in db.execute(select(ImageHash).where(ImageHash.url.in_(urls))).scalars()
+        }
+        missing = [url for url in urls if url not in hashes]
+        if missing:
+            with span('images.hash', count=len(missing)):
+                with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing)))) as executor:
+                    computed = dict(zip(missing, executor.map(fetch_image_hash, missing)))
+            new_hashes = {url: value for url, value in computed.items() if value is not None}
+            hashes.update(new_hashes)
+            db.add_all([ImageHash(url=url, dhash=f"{value:016x}") for url, value in new_hashes.items()])
+            db.commit()
+        return hashes
+    except Exception as e:
+        # Kayıt başarısız olsa da (örn. başka işçi aynı URL'yi eklediyse) hesaplanan hash'ler kullanılır
+        logger.error(f"Görsel hash deposu hatası: {str(e)}")
+        db.rollback()
+        return hashes
+    finally:
+        db.close()
+
+def dedupe_visual(urls: List[str], hashes: Dict[str, int],
+                  max_distance: int = IMAGE_PHASH_MAX_DISTANCE) -> List[str]:
+    """Görsel olarak birbirine çok yakın URL'lerden yalnızca ilkini bırak; hash'i olmayanlar korunur"""
+    kept: List[str] = []
+    kept_hashes: List[int] = []
+    for url in urls:
+        value = hashes.get(url)
+        if value is not None:
+            if any(hamming_distance(value, other) <= max_distance for other in kept_hashes):
+                continue
+            kept_hashes.append(value)
+        kept.append(url)
+    return kept
+
+def dedupe_record_images(records: List[ProductRecord], max_distance: int = IMAGE_PHASH_MAX_DISTANCE,
+                         workers: int = IMAGE_PHASH_WORKERS) -> List[ProductRecord]:
+    """Kayıtların görsellerini tek bir eşzamanlı hash geçişiyle görsel tekrarlardan arındır"""
+    hashes = image_hashes((url for record in records for url in record.image_urls), workers)
+    for record in records:
+        deduped = dedupe_visual(list(record.image_urls), hashes, max_distance)
+        if len(deduped) < len(record.image_urls):
+            logger.info(f"{len(record.image_urls) - len(deduped)} görsel tekrarı çıkarıldı: {record.title}")
+        record.image_urls = tuple(deduped)
+    return records
@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Yük testi sayfaları arşivlemez; DATABASE_URL verilmezse geçici bir SQLite veritabanı kullanılır
+LOADTEST_DB = Path(tempfile.gettempdir()) / 'trendyfetch_loadtest.db'
+USE_TEMP_DB = 'DATABASE_URL' not in os.environ
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{LOADTEST_DB}')
+os.environ.setdefault('PAGE_ARCHIVE', '0')
+
+import jwt
+import requests
+import scraper
+from api_service import app
+from benchmark import percentile
+from database import init_db
+from pipeline import run_pipeline
+from replay_server import DEFAULT_PORT, STATS_PATH
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+SCENARIOS = ('scrape', 'persist', 'refresh')
+
+DEFAULT_URLS = 1000
+DEFAULT_CONCURRENCY = 16
+ORIGIN_STARTUP_TIMEOUT = 10.0
+
+def product_urls(count: int, unique: Optional[int] = None) -> List[str]:
+    """Yük testi ürün URL'leri; unique verilirse URL'ler tekrar eder (önbellek/singleflight için)"""
+    unique = unique or count
+    return [f"https://www.trendyol.com/loadtest/urun-{index % unique}-p-{900000 + index % unique}"
+            for index in range(count)]
+
+def start_origin(port: int, origin_args: List[str]) -> subprocess.Popen:
+    """Kaynak sunucuyu ayrı süreçte başlat ve hazır olmasını bekle"""
+    process = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / 'replay_server.py'), '--port', str(port), *origin_args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + ORIGIN_STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}{STATS_PATH}", timeout=1)
+            return process
+        except requests.RequestException:
+            if process.poll() is not None:
+                raise RuntimeError("Kaynak sunucu başlatılamadı")
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Kaynak sunucu zamanında hazır olmadı")
+
+def origin_stats(origin: str) -> Dict[str, int]:
+    try:
+        return requests.get(f"{origin}{STATS_PATH}", timeout=5).json()
+    except requests.RequestException:
+        return {}
+
+class ResourceMeter:
+    """Senaryo boyunca duvar saati, CPU süresi (alt süreçler dahil) ve tepe bellek"""
+
+    def __enter__(self) -> 'ResourceMeter':
+        self.started = time.perf_counter()
+        self.usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.elapsed = time.perf_counter() - self.started
+        after = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+        self.cpu_seconds = sum(
+            (end.ru_utime + end.ru_stime) - (start.ru_utime + start.ru_stime)
+            for start, end in zip(self.usage, after)
+        )
+        # Linux'ta ru_maxrss KB cinsindendir
+        self.max_rss_mb = after[0].ru_maxrss / 1024
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'elapsed_seconds': round(self.elapsed, 2),
+            'cpu_seconds': round(self.cpu_seconds, 2),
+            'cpu_percent': round(self.cpu_seconds / self.elapsed * 100, 1) if self.elapsed else 0.0,
+            'max_rss_mb': round(self.max_rss_mb, 1),
+        }
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {}
+    return {
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'max_ms': round(max(latencies), 1),
+    }
+
+def timed(fn: Callable[[str], Any], latencies: List[float]) -> Callable[[str], Any]:
+    """Çağrı sürelerini listeye ekleyen sarmalayıcı (list.append thread-safe'dir)"""
+    def wrapper(url: str) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(url)
+        finally:
+            latencies.append((time.perf_counter() - start) * 1000)
+    return wrapper
+
+def run_scrape(urls: List[str], concurrency: int) -> Dict[str, Any]:
+    """URL'leri scrape_website (thread'li karşılığı) üzerinden eşzamanlı çek ve ayrıştır"""
+    latencies: List[float] = []
+    scrape = timed(scraper.scrape_website_sync, latencies)
+    with ResourceMeter() as meter:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(scrape, urls))
+    succeeded = sum(1 for result in results if result)
+    return {
+        'requests': len(urls),
+        'succeeded': succeeded,
+        'failed': len(urls) - succeeded,
+        'per_second': round(len(urls) / meter.elapsed, 1),
+        **latency_summary(latencies),
+        **meter.as_dict(),
+    }
+
+def run_persist(urls: List[str], concurrency: int) -> Dict[str, Any]:
+    """URL'leri fetch -> parse -> persist hattından geçir"""
+    latencies: List[float] = []
+    with ResourceMeter() as meter:
+        stats = asyncio.run(run_pipeline(
+            urls, fetch_concurrency=concurrency, fetch=timed(scraper.fetch_product_html, latencies)
+        ))
+    return {
+        'requests': len(urls),
+        'succeeded': stats['parsed'],
+        'failed': stats['fetch_failed'] + stats['parse_failed'] + stats['write_failed'],
+        'inserted': stats['inserted'],
+        'updated': stats['updated'],
+        'per_second': round(len(urls) / meter.elapsed, 1),
+        **latency_summary(latencies),
+        **meter.as_dict(),
+    }
+
+def run_refresh() -> Dict[str, Any]:
+    """Kayıtlı tüm ürünleri /api/products/update uç noktasıyla yenile"""
+    token = jwt.encode({'user': 'loadtest'}, app.config['SECRET_KEY'], algorithm='HS256')
+    with ResourceMeter() as meter:
+        response = app.test_client().post('/api/products/update', headers={'X-API-Token': token})
+    result = response.get_json() or {}
+    if response.status_code != 200:
+        raise RuntimeError(f"Yenileme başarısız: HTTP {response.status_code} {result}")
+    requests_made = result['updated'] + result['failed']
+    return {
+        'requests': requests_made,
+        'succeeded': result['updated'],
+        'failed': result['failed'],
+        'skipped': result['skipped'] + result['deferred'],
+        'repriced': result['repriced'],
+        'per_second': round(requests_made / meter.elapsed, 1),
+        **meter.as_dict(),
+    }
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    header = (f"{'scenario':<10} {'requests':>9} {'ok':>7} {'failed':>7} {'req/s':>8} {'p50 ms':>9} "
+              f"{'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'cpu %':>7} {'rss MB':>8}")
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        if name == 'origin':
+            continue
+        latency = [f"{result[key]:>9.1f}" if key in result else f"{'-':>9}"
+                   for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')]
+        print(f"{name:<10} {result['requests']:>9} {result['succeeded']:>7} {result['failed']:>7} "
+              f"{result['per_second']:>8.1f} {' '.join(latency)} {result['cpu_percent']:>7.1f} "
+              f"{result['max_rss_mb']:>8.1f}")
+    print(f"\nKaynak sunucu yanıtları: {results.get('origin', {})}")
+
+def run(scenarios: List[str], url_count: int, unique: Optional[int], concurrency: int,
+        origin: str) -> Dict[str, Dict[str, Any]]:
+    """Senaryoları sırayla çalıştır; refresh, persist senaryosunun kaydettiği ürünleri yeniler"""
+    scraper.SCRAPE_ORIGIN = origin
+    if USE_TEMP_DB:
+        LOADTEST_DB.unlink(missing_ok=True)
+    init_db()
+
+    urls = product_urls(url_count, unique)
+    runners = {
+        'scrape': lambda: run_scrape(urls, concurrency),
+        'persist': lambda: run_persist(urls, concurrency),
+        'refresh': run_refresh,
+    }
+    results = {}
+    for name in scenarios:
+        # Önceki senaryonun açtığı devreler sonrakini etkilemesin
+        scraper.host_breaker.reset()
+        logger.info(f"Senaryo başlıyor: {name} ({len(urls)} URL, eşzamanlılık {concurrency})")
+        results[name] = runners[name]()
+        logger.info(f"Senaryo tamamlandı: {name} {results[name]}")
+    results['origin'] = origin_stats(origin)
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Yerel kaynak sunucuya karşı uçtan uca yük testi (scrape, kaydetme, yenileme)",
+        epilog="--latency-ms, --error-rate vb. bilinmeyen argümanlar replay_server.py'ye aktarılır"
+    )
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Virgülle ayrılmış senaryolar ({', '.join(SCENARIOS)})")
+    parser.add_argument('--urls', type=int, default=DEFAULT_URLS)
+    parser.add_argument('--unique', type=int, default=None, help="Farklı URL sayısı (varsayılan: hepsi farklı)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--origin', help="Çalışan bir kaynak sunucu kullan (örn. http://127.0.0.1:8900)")
+    parser.add_argument('--json', type=Path, help="Sonuçları JSON olarak bu dosyaya yaz")
+    args, origin_args = parser.parse_known_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Bilinmeyen senaryo: {', '.join(unknown)}")
+
+    # İstek başına loglar ölçümü bozmasın
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    process = None if args.origin else start_origin(args.port, origin_args)
+    try:
+        results = run(scenarios, args.urls, args.unique, args.concurrency,
+                      args.origin or f"http://127.0.0.1:{args.port}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,25 @@
 import streamlit as st
 import asyncio
 import base64
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import StringIO
-from scraper import scrape_website
+from typing import Callable, Dict, List, Optional, Tuple
+from category_classifier import classify_category
+from pricing import sell_price
+from product_record import ProductRecord
+from scraper import is_valid_trendyol_url, normalize_product_url
+from scrape_cache import cached_scrape_website, conversion_results
+from tracing import traced
 import pandas as pd
 import requests
 from urllib.parse import urlparse
 
+# Toplu modda aynı anda çalışacak en fazla scraping işçisi
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '8'))
+SINGLE_MODE = "Tek URL"
+BATCH_MODE = "Toplu URL"
+
 def is_valid_image_url(url: str) -> bool:
     """Görsel URL'sinin geçerli olup olmadığını kontrol et"""
     try:
@@ -33,7 +46,8 @@ def clean_text(text, max_length):
     text = ' '.join(text.split())
     return text[:max_length]
 
-def convert_to_shopify_csv(data: dict) -> pd.DataFrame:
+@traced()
+def convert_to_shopify_csv(data: ProductRecord) -> pd.DataFrame:
     """Ürün verisini Shopify CSV formatına dönüştür"""
     try:
         # Temel ürün verisi
@@ -42,40 +56,8 @@ def convert_to_shopify_csv(data: dict) -> pd.DataFrame:
         base_price = data.get('price', 0)
         raw_category = data.get('category', 'Giyim')
 
-        # Kategori dönüşümü
-        category_mapping = {
-            'Giyim': 'Clothing & Accessories > Women\'s Clothing',
-            'Elbise': 'Clothing & Accessories > Women\'s Clothing > Dresses',
-            'Ayakkabı': 'Shoes > Women\'s Shoes',
-            'Çanta': 'Bags & Purses > Handbags',
-            'Aksesuar': 'Jewelry & Accessories > Fashion Accessories',
-            'Ev & Yaşam': 'Home & Living',
-            'Elektronik': 'Electronics > Consumer Electronics',
-            'Kozmetik': 'Health & Beauty > Personal Care',
-            'Spor': 'Sports & Recreation > Athletic Clothing',
-            'Çocuk': 'Kids & Baby > Children\'s Clothing',
-            'Erkek': 'Clothing & Accessories > Men\'s Clothing',
-            'Kitap': 'Books, Movies & Music > Books'
-        }
-
-        # Product Type mapping
-        type_mapping = {
-            'Giyim': 'Casual Wear',
-            'Elbise': 'Dress',
-            'Ayakkabı': 'Shoes',
-            'Çanta': 'Handbag',
-            'Aksesuar': 'Accessory',
-            'Ev & Yaşam': 'Home Decor',
-            'Elektronik': 'Electronic Device',
-            'Kozmetik': 'Beauty Product',
-            'Spor': 'Sportswear',
-            'Çocuk': 'Kids Wear',
-            'Erkek': 'Menswear',
-            'Kitap': 'Book'
-        }
-
-        shopify_category = category_mapping.get(raw_category, 'Clothing & Accessories > General')
-        product_type = type_mapping.get(raw_category, 'General')
+        # Kategori dönüşümü: tam breadcrumb yolu varsa en uzun eşleşen önekten, yoksa kategori adından
+        shopify_category, product_type = classify_category(data.get('category_path', raw_category))
 
         base_data = {
             'Handle': handle,
@@ -93,7 +75,7 @@ def convert_to_shopify_csv(data: dict) -> pd.DataFrame:
             'Variant Inventory Qty': '100',
             'Variant Inventory Policy': 'deny',
             'Variant Fulfillment Service': 'manual',
-            'Variant Price': str(base_price),
+            'Variant Price': str(sell_price(base_price, raw_category)),
             'Variant Requires Shipping': 'TRUE',
             'Variant Taxable': 'TRUE',
             'Status': 'active'
@@ -153,6 +135,122 @@ def get_csv_download_link(df: pd.DataFrame, filename: str) -> str:
     href = f'<a href="data:file/csv;base64,{b64}" download="{filename}" class="download-button">CSV Dosyasını İndir</a>'
     return href
 
+def parse_url_list(text: str) -> List[str]:
+    """Yapıştırılan veya yüklenen metinden URL listesini çıkar (satır/virgül ayrımlı, tekrarsız)"""
+    urls = []
+    seen = set()
+    for line in text.replace(',', '\n').replace(';', '\n').splitlines():
+        url = line.strip().strip('"').strip("'")
+        if url and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+def scrape_single(url: str, refresh: bool = False) -> List[ProductRecord]:
+    """Tek bir URL'yi kendi event loop'unda çek; sonuçlar oturumlar arası önbellekten gelir"""
+    return asyncio.run(cached_scrape_website(url, refresh=refresh))
+
+def convert_cached(url: str, data: ProductRecord, refresh: bool = False) -> pd.DataFrame:
+    """convert_to_shopify_csv sonucunu aynı scrape sonucu için yeniden kullan"""
+    key = normalize_product_url(url)
+    cached = None if refresh else conversion_results.get(key)
+    # Scrape sonucu yenilendiyse (farklı nesne) dönüşüm de yenilenir
+    if cached is not None and cached[0] is data:
+        return cached[1].copy()
+
+    df = convert_to_shopify_csv(data)
+    if not df.empty:
+        conversion_results.set(key, (data, df))
+    return df.copy()
+
+def scrape_urls_concurrently(urls: List[str], max_workers: int = BATCH_MAX_WORKERS,
+                             on_progress: Optional[Callable[[int, int], None]] = None,
+                             refresh: bool = False) -> Tuple[Dict[str, ProductRecord], Dict[str, str]]:
+    """
+    URL'leri sınırlı sayıda işçiyle eşzamanlı olarak çek
+    (başarılı sonuçlar, hata mesajları) sözlüklerini URL'ye göre döndürür
+    """
+    results: Dict[str, ProductRecord] = {}
+    errors: Dict[str, str] = {}
+    completed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(scrape_single, url, refresh): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                result = future.result()
+                if result and len(result) > 0:
+                    results[url] = result[0]
+                else:
+                    errors[url] = "Veri çekilemedi"
+            except Exception as e:
+                errors[url] = str(e)
+            completed += 1
+            if on_progress:
+                on_progress(completed, len(urls))
+
+    return results, errors
+
+def render_batch_mode(col_download):
+    """Toplu URL modu: listeyi eşzamanlı çek ve tek bir CSV'de birleştir"""
+    urls_text = st.text_area(
+        "Ürün URL'lerini girin (her satıra bir URL):",
+        placeholder="https://www.trendyol.com/...\nhttps://www.trendyol.com/...",
+        height=200
+    )
+    uploaded_file = st.file_uploader("veya URL listesi yükleyin", type=['txt', 'csv'])
+    max_workers = st.slider("Eşzamanlı işçi sayısı", 1, 16, min(BATCH_MAX_WORKERS, 16))
+    refresh = st.checkbox("Önbelleği yoksay ve yeniden çek")
+
+    text = urls_text or ''
+    if uploaded_file is not None:
+        text += '\n' + uploaded_file.getvalue().decode('utf-8-sig', errors='ignore')
+
+    urls = parse_url_list(text)
+    valid_urls = [url for url in urls if is_valid_trendyol_url(url)]
+    invalid_urls = [url for url in urls if url not in valid_urls]
+
+    if invalid_urls:
+        st.warning(f"{len(invalid_urls)} geçersiz URL atlandı")
+
+    if not valid_urls:
+        return
+
+    st.write(f"**{len(valid_urls)}** ürün URL'si bulundu")
+    if not st.button("Verileri Çek"):
+        return
+
+    progress_bar = st.progress(0.0)
+    status = st.empty()
+
+    def on_progress(done: int, total: int):
+        progress_bar.progress(done / total)
+        status.text(f"{done}/{total} ürün işlendi")
+
+    with st.spinner("Veriler çekiliyor..."):
+        results, errors = scrape_urls_concurrently(valid_urls, max_workers, on_progress, refresh)
+
+    # Girdi sırasını koruyarak tüm ürünleri tek CSV'de birleştir
+    frames = [convert_cached(url, results[url], refresh) for url in valid_urls if url in results]
+    frames = [df for df in frames if not df.empty]
+
+    st.success(f"{len(frames)} ürün başarıyla çekildi, {len(errors)} ürün başarısız")
+
+    if frames:
+        merged_df = pd.concat(frames, ignore_index=True)
+        with col_download:
+            st.markdown(get_csv_download_link(merged_df, "shopify_urunler.csv"), unsafe_allow_html=True)
+
+        st.header("CSV Önizleme")
+        st.dataframe(merged_df)
+
+    if errors:
+        with st.expander("Başarısız URL'ler"):
+            st.dataframe(pd.DataFrame(
+                [{'URL': url, 'Hata': message} for url, message in errors.items()]
+            ))
+
 def main():
     # Sayfa yapılandırması
     st.set_page_config(
@@ -167,24 +265,35 @@ def main():
     with col_title:
         st.title("Turmarkt Veri Yazılımı")
 
-    # URL giriş alanı
-    url = st.text_input(
-        "Ürün URL'sini girin:",
-        placeholder="https://www.trendyol.com/...",
-        help="Analiz etmek istediğiniz ürünün linkini yapıştırın"
-    )
+    mode = st.radio("Mod", [SINGLE_MODE, BATCH_MODE], horizontal=True, label_visibility="collapsed")
+
+    url = None
+    refresh = False
+    if mode == BATCH_MODE:
+        render_batch_mode(col_download)
+    else:
+        col_url, col_refresh = st.columns([6, 1])
+        with col_url:
+            # URL giriş alanı
+            url = st.text_input(
+                "Ürün URL'sini girin:",
+                placeholder="https://www.trendyol.com/...",
+                help="Analiz etmek istediğiniz ürünün linkini yapıştırın"
+            )
+        with col_refresh:
+            refresh = st.button("Yenile", help="Önbelleği atla ve veriyi yeniden çek")
 
     if url:
         with st.spinner("Veri çekiliyor..."):
             try:
                 # Veri çek
-                result = asyncio.run(scrape_website(url))
+                result = scrape_single(url, refresh)
 
                 if result and len(result) > 0:
                     data = result[0]
 
                     # CSV dönüşümü
-                    df = convert_to_shopify_csv(data)
+                    df = convert_cached(url, data, refresh)
 
                     # İndirme butonunu sağ üst köşeye yerleştir
                     with col_download:
@@ -222,7 +331,7 @@ def main():
                         st.write(f"**Başlık:** {title}")
 
                         # Fiyat
-                        price = data.get('price', 0)
+                        price = sell_price(data.get('price', 0), data.get('category'))
                         if isinstance(price, (int, float)) and price > 0:
                             try:
                                 price_int = int(price)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import zstandard
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Arşiv ayarları
+PAGE_ARCHIVE_ENABLED = os.getenv('PAGE_ARCHIVE', '1') == '1'
+PAGE_ARCHIVE_DIR = Path(os.getenv('PAGE_ARCHIVE_DIR', 'page_archive'))
+PAGE_ARCHIVE_LEVEL = int(os.getenv('PAGE_ARCHIVE_LEVEL', '10'))
+
+INDEX_FILE = 'index.jsonl'
+
+# zstd sıkıştırıcıları thread'ler arasında paylaşılamaz
+_local = threading.local()
+_index_lock = threading.Lock()
+
+def _compressor() -> zstandard.ZstdCompressor:
+    if not hasattr(_local, 'compressor'):
+        _local.compressor = zstandard.ZstdCompressor(level=PAGE_ARCHIVE_LEVEL)
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.compressor
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    _compressor()
+    return _local.decompressor
+
+def object_path(digest: str, root: Optional[Path] = None) -> Path:
+    """İçerik özetine göre sıkıştırılmış sayfanın yolu (objects/ab/abcdef....zst)"""
+    root = root or PAGE_ARCHIVE_DIR
+    return root / 'objects' / digest[:2] / f"{digest}.zst"
+
+def archive_page(url: str, html: str, fetched_at: Optional[datetime] = None,
+                 root: Optional[Path] = None) -> str:
+    """
+    Sayfa gövdesini içerik adresli olarak sakla ve URL/zaman kaydını dizine ekle
+    Aynı içerik birden fazla kez çekilse de diskte bir kez tutulur; içerik özetini döndürür
+    """
+    root = root or PAGE_ARCHIVE_DIR
+    body = html.encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()
+    path = object_path(digest, root)
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Yarım yazılmış dosya görülmesin diye önce geçici dosyaya yazılır
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(_compressor().compress(body))
+        os.replace(tmp_path, path)
+
+    entry = {
+        'url': url,
+        'sha256': digest,
+        'fetched_at': (fetched_at or datetime.utcnow()).isoformat(),
+        'size': len(body),
+    }
+    with _index_lock:
+        with open(root / INDEX_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return digest
+
+def load_page(digest: str, root: Optional[Path] = None) -> str:
+    """Arşivlenmiş sayfayı aç"""
+    data = object_path(digest, root).read_bytes()
+    return _decompressor().decompress(data).decode('utf-8')
+
+def iter_snapshots(root: Optional[Path] = None) -> Iterator[Dict[str, str]]:
+    """Dizindeki tüm kayıtları yazılma sırasıyla döndür"""
+    index_path = (root or PAGE_ARCHIVE_DIR) / INDEX_FILE
+    if not index_path.exists():
+        return
+    with open(index_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Yarıda kesilmiş son satır atlanır
+                logger.warning(f"Bozuk arşiv dizini satırı atlandı: {line[:80]}")
+
+def latest_snapshots(since: Optional[datetime] = None, root: Optional[Path] = None) -> Dict[str, Dict[str, str]]:
+    """Her URL için en son arşivlenen kayıt; since verilirse daha eski kayıtlar atlanır"""
+    latest: Dict[str, Dict[str, str]] = {}
+    for entry in iter_snapshots(root):
+        if since and datetime.fromisoformat(entry['fetched_at']) < since:
+            continue
+        current = latest.get(entry['url'])
+        if current is None or entry['fetched_at'] >= current['fetched_at']:
+            latest[entry['url']] = entry
+    return latest
+
+def archive_stats(root: Optional[Path] = None) -> Dict[str, int]:
+    """Kayıt, URL, nesne sayısı ve disk/ham boyut karşılaştırması"""
+    root = root or PAGE_ARCHIVE_DIR
+    entries = 0
+    urls = set()
+    raw_bytes = {}
+    for entry in iter_snapshots(root):
+        entries += 1
+        urls.add(entry['url'])
+        raw_bytes[entry['sha256']] = entry['size']
+    stored_bytes = sum(object_path(digest, root).stat().st_size
+                       for digest in raw_bytes if object_path(digest, root).exists())
+    return {
+        'snapshots': entries,
+        'urls': len(urls),
+        'objects': len(raw_bytes),
+        'raw_bytes': sum(raw_bytes.values()),
+        'stored_bytes': stored_bytes,
+    }
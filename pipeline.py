@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, Product
+from pricing import reprice_catalog
+from product_record import ProductRecord
+from data_processor import apply_scraped_update, build_product_models, prepare_items
+from scraper import IMAGE_PHASH_ENABLED, fetch_product_html, parse_product_html
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hat ayarları
+PIPELINE_FETCH_CONCURRENCY = int(os.getenv('PIPELINE_FETCH_CONCURRENCY', '16'))
+PIPELINE_PARSE_WORKERS = int(os.getenv('PIPELINE_PARSE_WORKERS', str(os.cpu_count() or 2)))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '64'))
+PIPELINE_WRITE_BATCH = int(os.getenv('PIPELINE_WRITE_BATCH', '100'))
+
+# Aşamalar arası kuyruklarda iş bitişini bildiren işaret
+_DONE = object()
+
+class PipelineStats:
+    """Hat boyunca sayaçlar"""
+
+    def __init__(self):
+        self.fetched = 0
+        self.fetch_failed = 0
+        self.parsed = 0
+        self.parse_failed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.write_failed = 0
+        self.started = time.perf_counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'fetched': self.fetched,
+            'fetch_failed': self.fetch_failed,
+            'parsed': self.parsed,
+            'parse_failed': self.parse_failed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'write_failed': self.write_failed,
+            'elapsed_seconds': round(elapsed, 2),
+            'pages_per_second': round(self.parsed / elapsed, 2) if elapsed else 0.0,
+        }
+
+async def load_existing_products(db: AsyncSession, urls: List[str]) -> Dict[str, Product]:
+    """Kaynak URL'si bilinen ürünleri getir (aynı URL'li ürünlerden ilki kullanılır)"""
+    existing: Dict[str, Product] = {}
+    # Görsel karşılaştırması için görseller de yüklenir (async oturumda lazy load yapılamaz)
+    rows = await db.execute(
+        select(Product).where(Product.source_url.in_(urls)).options(selectinload(Product.images))
+    )
+    for product in rows.scalars():
+        existing.setdefault(product.source_url, product)
+    return existing
+
+def plan_batch(results: List[ProductRecord],
+               existing: Dict[str, Product]) -> Tuple[List[Tuple[Product, ProductRecord]], List[Product]]:
+    """Partiyi güncellenecek (ürün, sonuç) çiftlerine ve eklenecek yeni ürün modellerine ayır"""
+    updates: List[Tuple[Product, ProductRecord]] = []
+    new_items: Dict[str, ProductRecord] = {}
+    for result in results:
+        product = existing.get(result.source_url)
+        if product is None:
+            # Aynı partide tekrar eden yeni URL'ler tek ürün olarak eklenir
+            new_items[result.source_url] = result
+        else:
+            updates.append((product, result))
+
+    items = prepare_items(list(new_items.values())) if new_items else None
+    if items is None or items.empty:
+        return updates, []
+    return updates, [build_product_models(item) for item in items.to_dict('records')]
+
+async def persist_batch_async(results: List[ProductRecord]) -> Dict[str, int]:
+    """
+    Ayrıştırılmış ürünleri tek işlemde kaydet: kaynak URL'si bilinenleri güncelle, diğerlerini ekle
+    Parti bir savepoint içinde yazılır; başarısız olursa her ürün kendi savepoint'inde yeniden
+    yazılır, böylece yalnızca hatalı ürünler yazılamamış sayılır
+    """
+    urls = [result.source_url for result in results]
+    async with AsyncSessionLocal() as db:
+        try:
+            async with db.begin_nested():
+                updates, new_products = plan_batch(results, await load_existing_products(db, urls))
+                updated = sum(1 for product, result in updates if apply_scraped_update(db, product, result))
+                db.add_all(new_products)
+            counts = {'inserted': len(new_products), 'updated': updated, 'failed': 0}
+        except Exception as e:
+            logger.warning(f"Toplu yazma başarısız, ürünler tek tek yazılıyor: {str(e)}")
+            # Savepoint'te değişen nesneler geçersiz kalır; parti temiz oturum durumundan yeniden kurulur
+            await db.rollback()
+            updates, new_products = plan_batch(results, await load_existing_products(db, urls))
+            counts = {'inserted': 0, 'updated': 0, 'failed': 0}
+            for product, result in updates:
+                try:
+                    async with db.begin_nested():
+                        changed = apply_scraped_update(db, product, result)
+                    counts['updated'] += int(changed)
+                except Exception as e:
+                    counts['failed'] += 1
+                    logger.error(f"Ürün yazma hatası ({result.source_url}): {str(e)}")
+            for product in new_products:
+                try:
+                    async with db.begin_nested():
+                        db.add(product)
+                    counts['inserted'] += 1
+                except Exception as e:
+                    counts['failed'] += 1
+                    logger.error(f"Ürün yazma hatası ({product.source_url}): {str(e)}")
+
+        await db.commit()
+    return counts
+
+async def run_pipeline(urls: List[str],
+                       fetch_concurrency: int = PIPELINE_FETCH_CONCURRENCY,
+                       parse_workers: int = PIPELINE_PARSE_WORKERS,
+                       queue_size: int = PIPELINE_QUEUE_SIZE,
+                       write_batch: int = PIPELINE_WRITE_BATCH,
+                       persist: bool = True,
+                       fetch: Callable[[str], Optional[str]] = fetch_product_html,
+                       on_result: Optional[Callable[[ProductRecord], None]] = None) -> Dict[str, Any]:
+    """
+    Fetch -> parse -> persist hattı
+    Fetch işleri thread havuzunda, CPU yoğun ayrıştırma süreç havuzunda, yazma tek bir
+    toplu yazıcıda çalışır; aşamalar arası sınırlı kuyruklar geri basınç uygular
+    """
+    stats = PipelineStats()
+    loop = asyncio.get_running_loop()
+    url_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    html_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    result_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_concurrency)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+
+    async def produce():
+        for url in urls:
+            await url_queue.put(url)
+        for _ in range(fetch_concurrency):
+            await url_queue.put(_DONE)
+
+    async def fetcher():
+        while (url := await url_queue.get()) is not _DONE:
+            try:
+                html = await loop.run_in_executor(fetch_pool, fetch, url)
+            except Exception as e:
+                logger.error(f"Fetch hatası ({url}): {str(e)}")
+                html = None
+            if html is None:
+                stats.fetch_failed += 1
+                continue
+            stats.fetched += 1
+            await html_queue.put((url, html))
+
+    async def parser():
+        while (item := await html_queue.get()) is not _DONE:
+            url, html = item
+            try:
+                products = await loop.run_in_executor(parse_pool, parse_product_html, html)
+            except Exception as e:
+                logger.error(f"Ayrıştırma hatası ({url}): {str(e)}")
+                products = []
+            if not products:
+                stats.parse_failed += 1
+                continue
+            stats.parsed += 1
+            if IMAGE_PHASH_ENABLED:
+                from image_dedupe import dedupe_record_images
+                products = await loop.run_in_executor(fetch_pool, dedupe_record_images, products)
+            for product in products:
+                product.source_url = url
+                if on_result:
+                    on_result(product)
+                await result_queue.put(product)
+
+    async def flush(batch: List[ProductRecord]):
+        if not persist or not batch:
+            return
+        try:
+            counts = await persist_batch_async(batch)
+            stats.inserted += counts['inserted']
+            stats.updated += counts['updated']
+            stats.write_failed += counts['failed']
+        except Exception as e:
+            stats.write_failed += len(batch)
+            logger.error(f"Toplu yazma hatası ({len(batch)} ürün): {str(e)}")
+
+    async def writer():
+        batch: List[ProductRecord] = []
+        while (product := await result_queue.get()) is not _DONE:
+            batch.append(product)
+            if len(batch) >= write_batch:
+                await flush(batch)
+                batch = []
+        await flush(batch)
+
+    async def close_stage(tasks: List[asyncio.Task], queue: asyncio.Queue, count: int):
+        await asyncio.gather(*tasks)
+        for _ in range(count):
+            await queue.put(_DONE)
+
+    try:
+        fetchers = [asyncio.create_task(fetcher()) for _ in range(fetch_concurrency)]
+        parsers = [asyncio.create_task(parser()) for _ in range(parse_workers)]
+        writer_task = asyncio.create_task(writer())
+        await asyncio.gather(
+            produce(),
+            close_stage(fetchers, html_queue, parse_workers),
+            close_stage(parsers, result_queue, 1),
+            writer_task,
+        )
+    finally:
+        fetch_pool.shutdown(wait=False, cancel_futures=True)
+        parse_pool.shutdown(wait=True, cancel_futures=True)
+
+    if persist and stats.updated:
+        # Güncellenen ürünlerin satış fiyatları yeni kaynak fiyatlardan hesaplanır
+        await asyncio.to_thread(reprice_catalog)
+
+    result = stats.as_dict()
+    logger.info(f"Hat tamamlandı: {result}")
+    return result
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="URL listesini fetch/parse/persist hattından geçir")
+    arg_parser.add_argument('file', help="Her satırda bir URL içeren dosya")
+    arg_parser.add_argument('--fetch-concurrency', type=int, default=PIPELINE_FETCH_CONCURRENCY)
+    arg_parser.add_argument('--parse-workers', type=int, default=PIPELINE_PARSE_WORKERS)
+    arg_parser.add_argument('--queue-size', type=int, default=PIPELINE_QUEUE_SIZE)
+    arg_parser.add_argument('--write-batch', type=int, default=PIPELINE_WRITE_BATCH)
+    arg_parser.add_argument('--dry-run', action='store_true', help="Veritabanına yazma")
+    args = arg_parser.parse_args()
+
+    with open(args.file, encoding='utf-8') as f:
+        url_list = [line.strip() for line in f if line.strip()]
+
+    asyncio.run(run_pipeline(
+        url_list,
+        fetch_concurrency=args.fetch_concurrency,
+        parse_workers=args.parse_workers,
+        queue_size=args.queue_size,
+        write_batch=args.write_batch,
+        persist=not args.dry_run,
+    ))
@@ -0,0 +1,222 @@
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+from database import get_db, init_db, Product, Variant
+from tracing import span
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fiyatlandırma ayarları
+PRICE_MARKUP_PERCENT = float(os.getenv('PRICE_MARKUP_PERCENT', '10'))
+PRICING_RULES_PATH = Path(os.getenv('PRICING_RULES_PATH', 'pricing_rules.json'))
+REPRICE_BATCH_SIZE = int(os.getenv('REPRICE_BATCH_SIZE', '5000'))
+
+ROUNDING_MODES = ('cents', 'charm', 'step')
+
+class PricingRules:
+    """
+    Kaynak fiyattan satış fiyatı hesaplama kuralları
+    Öncelik: kategori markup'ı > fiyat bandı markup'ı > varsayılan markup; ardından yuvarlama
+    (cents: 2 basamak, charm: x.99'a yukarı, step:N: N'nin katına yukarı)
+    """
+
+    def __init__(self, default_markup: float = PRICE_MARKUP_PERCENT,
+                 categories: Optional[Dict[str, float]] = None,
+                 price_bands: Optional[List[Dict[str, float]]] = None,
+                 rounding: str = 'cents'):
+        self.default_markup = float(default_markup)
+        self.categories = {name: float(markup) for name, markup in (categories or {}).items()}
+        # Bantlar üst sınıra göre sıralanır; kaynak fiyat < max olan ilk bant uygulanır
+        self.price_bands = sorted(
+            ({'max': float(band['max']), 'markup': float(band['markup'])} for band in (price_bands or [])),
+            key=lambda band: band['max']
+        )
+        mode = rounding.split(':', 1)[0]
+        if mode not in ROUNDING_MODES:
+            raise ValueError(f"Geçersiz yuvarlama kuralı: {rounding}")
+        if mode == 'step' and float(rounding.split(':', 1)[1]) <= 0:
+            raise ValueError(f"Geçersiz yuvarlama adımı: {rounding}")
+        self.rounding = rounding
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PricingRules':
+        return cls(
+            default_markup=data.get('default_markup', PRICE_MARKUP_PERCENT),
+            categories=data.get('categories'),
+            price_bands=data.get('price_bands'),
+            rounding=data.get('rounding', 'cents'),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'default_markup': self.default_markup,
+            'categories': self.categories,
+            'price_bands': self.price_bands,
+            'rounding': self.rounding,
+        }
+
+# Dosya değişmedikçe kurallar yeniden okunmaz: (yol, değişiklik zamanı) -> kurallar
+_rules_cache: Dict[Any, PricingRules] = {}
+
+def load_pricing_rules(path: Union[str, Path] = PRICING_RULES_PATH) -> PricingRules:
+    """Kuralları JSON dosyasından oku; dosya yoksa varsayılan (%PRICE_MARKUP_PERCENT) kurallar"""
+    path = Path(path)
+    try:
+        key = (str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        key = (str(path), None)
+    rules = _rules_cache.get(key)
+    if rules is None:
+        if key[1] is None:
+            rules = PricingRules()
+        else:
+            with open(path, encoding='utf-8') as f:
+                rules = PricingRules.from_dict(json.load(f))
+        _rules_cache.clear()
+        _rules_cache[key] = rules
+    return rules
+
+def markups_for(source_prices: pd.Series, categories: Optional[pd.Series], rules: PricingRules) -> pd.Series:
+    """Her satır için uygulanacak markup yüzdesi"""
+    markups = pd.Series(rules.default_markup, index=source_prices.index, dtype=float)
+
+    if rules.price_bands:
+        # Yüksek bantlardan düşüğe doğru atanır, böylece en dar uygun bant kalır
+        for band in reversed(rules.price_bands):
+            markups = markups.mask(source_prices < band['max'], band['markup'])
+
+    if categories is not None and rules.categories:
+        category_markups = categories.map(rules.categories)
+        markups = category_markups.fillna(markups).astype(float)
+
+    return markups
+
+def round_values(values: Union[np.ndarray, float], rounding: str) -> Union[np.ndarray, float]:
+    """Yuvarlama kuralını dizi veya tek değer üzerinde uygula"""
+    mode = rounding.split(':', 1)[0]
+    if mode == 'charm':
+        # Küçük kayan nokta hatalarında bir üst tam sayıya atlamamak için kuruş düzeyinde yuvarlanır
+        values = np.floor(np.round(values, 2)) + 0.99
+    elif mode == 'step':
+        step = float(rounding.split(':', 1)[1])
+        values = np.ceil(np.round(values / step, 6)) * step
+    return np.round(values, 2)
+
+def round_prices(prices: pd.Series, rounding: str) -> pd.Series:
+    """Yuvarlama kuralını vektörel olarak uygula"""
+    return pd.Series(round_values(prices.to_numpy(dtype=float), rounding), index=prices.index)
+
+def compute_sell_prices(source_prices: pd.Series, categories: Optional[pd.Series] = None,
+                        rules: Optional[PricingRules] = None) -> pd.Series:
+    """Kaynak fiyatlardan satış fiyatlarını tek vektörel geçişte hesapla; geçersiz fiyatlar 0.0 olur"""
+    rules = rules or load_pricing_rules()
+    source_prices = pd.to_numeric(source_prices, errors='coerce').fillna(0.0).astype(float)
+    markups = markups_for(source_prices, categories, rules)
+    sell_prices = round_prices(source_prices * (1 + markups / 100), rules.rounding)
+    return sell_prices.where(source_prices > 0, 0.0)
+
+def sell_price(source_price: float, category: Optional[str] = None,
+               rules: Optional[PricingRules] = None) -> float:
+    """Tek ürün için satış fiyatı (compute_sell_prices ile aynı kurallar, pandas'sız)"""
+    rules = rules or load_pricing_rules()
+    try:
+        price = float(source_price)
+    except (TypeError, ValueError):
+        return 0.0
+    if not price > 0:
+        return 0.0
+
+    markup = rules.default_markup
+    for band in rules.price_bands:
+        if price < band['max']:
+            markup = band['markup']
+            break
+    markup = rules.categories.get(category, markup)
+    return float(round_values(price * (1 + markup / 100), rules.rounding))
+
+def reprice_catalog(rules: Optional[PricingRules] = None, dry_run: bool = False,
+                    batch_size: int = REPRICE_BATCH_SIZE,
+                    product_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """
+    Katalogun (veya verilen ürünlerin) satış fiyatlarını ağ trafiği olmadan yeniden hesapla
+    Kaynak fiyatlar tek sorguda okunur, vektörel hesaplanır; yalnızca değişen varyantlar
+    toplu UPDATE ile yazılır ve ürünlerin updated_at'i delta dışa aktarım için ilerletilir
+    """
+    rules = rules or load_pricing_rules()
+    db = next(get_db())
+    try:
+        query = (
+            select(Variant.id, Variant.product_id, Variant.current_price, Product.source_price, Product.category)
+            .join(Product, Product.id == Variant.product_id)
+            .where(Product.source_price.isnot(None))
+        )
+        if product_ids is not None:
+            query = query.where(Product.id.in_(product_ids))
+        with span('pricing.load'):
+            rows = db.execute(query).all()
+        frame = pd.DataFrame(rows, columns=['id', 'product_id', 'current_price', 'source_price', 'category'])
+        stats = {'variants': len(frame), 'changed': 0, 'products': 0}
+        if frame.empty:
+            return stats
+
+        with span('pricing.compute', variants=len(frame)):
+            frame['sell_price'] = compute_sell_prices(frame['source_price'], frame['category'], rules)
+            changed = frame[
+                (frame['sell_price'] > 0)
+                & ((frame['current_price'] - frame['sell_price']).abs().fillna(np.inf) >= 0.005)
+            ]
+        stats['changed'] = len(changed)
+        stats['products'] = int(changed['product_id'].nunique())
+
+        if dry_run or changed.empty:
+            return stats
+
+        with span('pricing.write', variants=len(changed)):
+            now = datetime.utcnow()
+            for start in range(0, len(changed), batch_size):
+                chunk = changed.iloc[start:start + batch_size]
+                # Birincil anahtara göre toplu UPDATE (executemany)
+                db.execute(
+                    update(Variant),
+                    [{'id': int(variant_id), 'current_price': float(price)}
+                     for variant_id, price in zip(chunk['id'], chunk['sell_price'])]
+                )
+                db.execute(
+                    update(Product)
+                    .where(Product.id.in_([int(product_id) for product_id in chunk['product_id'].unique()]))
+                    .values(updated_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kaynak fiyatlardan satış fiyatlarını yeniden hesapla")
+    parser.add_argument('--rules', type=Path, default=PRICING_RULES_PATH, help="Kural dosyası (JSON)")
+    parser.add_argument('--dry-run', action='store_true', help="Değişecek fiyatları say, kaydetme")
+    parser.add_argument('--show-rules', action='store_true', help="Geçerli kuralları yazdır ve çık")
+    args = parser.parse_args()
+
+    pricing_rules = load_pricing_rules(args.rules)
+    if args.show_rules:
+        print(json.dumps(pricing_rules.as_dict(), ensure_ascii=False, indent=2))
+    else:
+        init_db()
+        started = datetime.utcnow()
+        result = reprice_catalog(pricing_rules, dry_run=args.dry_run)
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(f"Yeniden fiyatlandırma{' (deneme)' if args.dry_run else ''} tamamlandı: {result} ({elapsed:.2f} sn)")
@@ -0,0 +1,92 @@
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+import pandas as pd
+
+class ProductRecord:
+    """
+    Scrape edilmiş tek bir ürün için sabit alanlı, __slots__ tabanlı kayıt
+    Ürün başına sözlük yerine kullanılır; görseller demet (tuple) olarak tutulur.
+    Eski çağıranlar için sözlük benzeri okuma (get, [], in) desteklenir: değeri None
+    olan alan, sözlükte hiç olmayan anahtar gibi davranır
+    """
+
+    __slots__ = ('title', 'price', 'image_urls', 'properties', 'category', 'category_path',
+                 'brand', 'stock_status', 'source_url')
+
+    def __init__(self, title: Optional[str] = None, price: Any = None, image_urls: Iterable[str] = (),
+                 properties: Optional[Dict[str, Any]] = None, category: Optional[str] = None,
+                 category_path: Optional[str] = None, brand: Optional[str] = None,
+                 stock_status: Optional[bool] = None, source_url: Optional[str] = None):
+        self.title = title
+        self.price = price
+        self.image_urls: Tuple[str, ...] = tuple(image_urls or ())
+        self.properties = properties
+        self.category = category
+        self.category_path = category_path  # Kökten yaprağa breadcrumb yolu ('Giyim > Üst Giyim > T-Shirt')
+        self.brand = brand
+        self.stock_status = stock_status
+        self.source_url = source_url
+
+    @classmethod
+    def coerce(cls, item: Union['ProductRecord', Mapping[str, Any]]) -> 'ProductRecord':
+        """Sözlükleri kayda çevir; zaten kayıt olanları kopyalamadan döndür"""
+        if isinstance(item, cls):
+            return item
+        return cls(**{field: item[field] for field in cls.__slots__ if field in item})
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__ or getattr(self, key) is None:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def keys(self) -> Iterator[str]:
+        return (field for field in self.__slots__ if getattr(self, field) is not None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON'a yazılabilir sözlük (görseller liste olarak)"""
+        data = {field: self[field] for field in self.keys()}
+        data['image_urls'] = list(self.image_urls)
+        return data
+
+    def copy(self, **changes: Any) -> 'ProductRecord':
+        """Sığ kopya; verilen alanlar değiştirilerek"""
+        fields = {field: getattr(self, field) for field in self.__slots__}
+        fields.update(changes)
+        return ProductRecord(**fields)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ProductRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(title={self.title!r}, price={self.price!r}, images={len(self.image_urls)})"
+
+def records_to_frame(records: Iterable[Union[ProductRecord, Mapping[str, Any]]]) -> pd.DataFrame:
+    """
+    Kayıtları ara kopya oluşturmadan sütun sütun DataFrame'e dönüştür
+    Eksik alanlar prepare_items'ın beklediği varsayılanlarla doldurulur
+    """
+    records: List[ProductRecord] = [ProductRecord.coerce(record) for record in records]
+    return pd.DataFrame({
+        'title': [record.title or '' for record in records],
+        'price': [record.price if record.price is not None else 0.0 for record in records],
+        'brand': [record.brand or '' for record in records],
+        'image_urls': [record.image_urls for record in records],
+        'properties': [record.properties or {} for record in records],
+        'stock_status': [True if record.stock_status is None else record.stock_status for record in records],
+        'category': [record.category for record in records],
+        'category_path': [record.category_path for record in records],
+        'source_url': [record.source_url for record in records],
+    })
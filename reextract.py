@@ -0,0 +1,96 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from database import get_db, init_db, Product
+from data_processor import apply_product_content
+from page_archive import latest_snapshots, load_page
+from product_record import ProductRecord
+from scraper import parse_product_html
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Yeniden ayrıştırma ayarları
+REEXTRACT_WORKERS = int(os.getenv('REEXTRACT_WORKERS', str(os.cpu_count() or 2)))
+REEXTRACT_BATCH = int(os.getenv('REEXTRACT_BATCH', '200'))
+
+def extract_snapshot(digest: str) -> List[ProductRecord]:
+    """Arşivlenmiş sayfayı güncel çıkarıcılarla ayrıştır (süreç havuzunda çalışır)"""
+    try:
+        return parse_product_html(load_page(digest))
+    except Exception as e:
+        logger.error(f"Arşiv ayrıştırma hatası ({digest}): {str(e)}")
+        return []
+
+def apply_batch(results: List[Tuple[str, ProductRecord]], dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Ayrıştırılan içerikleri kayıtlı ürünlere uygula; (eşleşen, değişen) ürün sayısını döndürür
+    Fiyat geçmişine kayıt eklenmez, arşivlenmiş fiyat güncel fiyat yerine geçmez
+    """
+    by_url = dict(results)
+    db = next(get_db())
+    try:
+        products = db.execute(
+            select(Product).where(Product.source_url.in_(list(by_url))).options(selectinload(Product.images))
+        ).scalars().all()
+        changed = 0
+        for product in products:
+            if apply_product_content(product, by_url[product.source_url]):
+                changed += 1
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        return len(products), changed
+    finally:
+        db.close()
+
+def reextract(since: Optional[datetime] = None, workers: int = REEXTRACT_WORKERS,
+              batch_size: int = REEXTRACT_BATCH, dry_run: bool = False) -> Dict[str, int]:
+    """Her URL'nin son arşivlenmiş sayfasını paralel olarak yeniden ayrıştır ve veritabanını güncelle"""
+    snapshots = latest_snapshots(since)
+    urls = list(snapshots)
+    digests = [snapshots[url]['sha256'] for url in urls]
+    logger.info(f"{len(urls)} arşivlenmiş sayfa yeniden ayrıştırılacak")
+
+    stats = {'snapshots': len(urls), 'parse_failed': 0, 'matched': 0, 'changed': 0}
+    batch: List[Tuple[str, ProductRecord]] = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(digests) // (workers * 4))
+        for url, products in zip(urls, executor.map(extract_snapshot, digests, chunksize=chunksize)):
+            if not products:
+                stats['parse_failed'] += 1
+                continue
+            batch.append((url, products[0]))
+            if len(batch) >= batch_size:
+                matched, changed = apply_batch(batch, dry_run)
+                stats['matched'] += matched
+                stats['changed'] += changed
+                batch = []
+
+    if batch:
+        matched, changed = apply_batch(batch, dry_run)
+        stats['matched'] += matched
+        stats['changed'] += changed
+
+    logger.info(f"Yeniden ayrıştırma tamamlandı{' (deneme)' if dry_run else ''}: {stats}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arşivlenmiş sayfaları güncel seçicilerle yeniden ayrıştır")
+    parser.add_argument('--since', type=datetime.fromisoformat, default=None,
+                        help="Yalnızca bu tarihten (ISO) sonra arşivlenen sayfalar")
+    parser.add_argument('--workers', type=int, default=REEXTRACT_WORKERS)
+    parser.add_argument('--batch-size', type=int, default=REEXTRACT_BATCH)
+    parser.add_argument('--dry-run', action='store_true', help="Değişiklikleri kaydetmeden say")
+    args = parser.parse_args()
+
+    init_db()
+    reextract(args.since, args.workers, args.batch_size, args.dry_run)
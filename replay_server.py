@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+from page_archive import latest_snapshots, load_page
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).parent
+ASSETS_DIR = BASE_DIR / 'TrendyFetch' / 'attached_assets'
+PAGE_PATTERN = 'Pasted--DOCTYPE-html-html-lang-tr-TR-*.txt'
+
+DEFAULT_PORT = 8900
+STATS_PATH = '/__stats'
+
+class ReplayConfig:
+    """Kaynak sunucunun davranışı: gecikme ve hata/kısıtlama yanıtlarının oranları"""
+
+    def __init__(self, latency_ms: float = 0.0, tail_ms: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, not_found_rate: float = 0.0, retry_after: int = 1,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms  # Her yanıttan önce sabit bekleme
+        self.tail_ms = tail_ms  # Üstel dağılımlı ek bekleme ortalaması (kuyruk gecikmesi)
+        self.error_rate = error_rate  # HTTP 503
+        self.throttle_rate = throttle_rate  # HTTP 429 + Retry-After
+        self.not_found_rate = not_found_rate  # HTTP 404 (yayından kalkmış ürün)
+        self.retry_after = retry_after
+        self.seed = seed
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Kaydedilmiş Trendyol sayfalarını sunan yerel kaynak sunucu
+    Her yol (path) kayıtlı sayfalardan birine kararlı biçimde eşlenir, böylece binlerce farklı
+    ürün URL'si aynı birkaç sayfayla sunulabilir; arşiv verilirse arşivde yolu birebir
+    eşleşen URL'lerin kendi sayfası döner
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, config: ReplayConfig, pages: List[str],
+                 archive: Optional[Dict[str, str]] = None):
+        super().__init__(address, ReplayHandler)
+        self.config = config
+        self.pages = pages
+        self.archive = archive or {}
+        self.random = random.Random(config.seed)
+        self.stats: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def page_for(self, path: str) -> str:
+        digest = self.archive.get(path)
+        if digest is not None:
+            return load_page(digest)
+        return self.pages[zlib.crc32(path.encode('utf-8')) % len(self.pages)]
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == STATS_PATH:
+            with self.server._stats_lock:
+                self.send_body(200, json.dumps(self.server.stats).encode('utf-8'), 'application/json')
+            return
+
+        config = self.server.config
+        rng = self.server.random
+        delay = config.latency_ms + (rng.expovariate(1 / config.tail_ms) if config.tail_ms > 0 else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = rng.random()
+        if roll < config.throttle_rate:
+            self.server.count('429')
+            self.send_body(429, b'Too Many Requests', headers={'Retry-After': str(config.retry_after)})
+        elif roll < config.throttle_rate + config.error_rate:
+            self.server.count('503')
+            self.send_body(503, b'Service Unavailable')
+        elif roll < config.throttle_rate + config.error_rate + config.not_found_rate:
+            self.server.count('404')
+            self.send_body(404, b'Not Found')
+        else:
+            self.server.count('200')
+            self.send_body(200, self.server.page_for(self.path).encode('utf-8'), 'text/html; charset=utf-8')
+
+    def send_body(self, status: int, body: bytes, content_type: str = 'text/plain',
+                  headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Yük altında istek başına log basılmaz
+        pass
+
+def load_replay_pages(assets_dir: Path = ASSETS_DIR) -> List[str]:
+    """Kaydedilmiş ürün sayfalarını yükle"""
+    pages = [path.read_text(encoding='utf-8') for path in sorted(assets_dir.glob(PAGE_PATTERN))]
+    if not pages:
+        raise FileNotFoundError(f"Kaydedilmiş sayfa bulunamadı: {assets_dir}")
+    return pages
+
+def load_archive_paths() -> Dict[str, str]:
+    """Sayfa arşivindeki URL'lerin yolu -> son kaydın özeti"""
+    archive = {}
+    for url, entry in latest_snapshots().items():
+        parts = urlsplit(url if '://' in url else 'https://' + url)
+        archive[parts.path + (f'?{parts.query}' if parts.query else '')] = entry['sha256']
+    return archive
+
+def create_server(config: ReplayConfig, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                  use_archive: bool = False) -> ReplayServer:
+    return ReplayServer((host, port), config, load_replay_pages(),
+                        load_archive_paths() if use_archive else None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kaydedilmiş sayfaları sunan yerel Trendyol kaynak sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Her yanıttan önce sabit bekleme")
+    parser.add_argument('--tail-ms', type=float, default=0.0, help="Üstel ek bekleme ortalaması")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="HTTP 503 oranı")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="HTTP 429 oranı")
+    parser.add_argument('--not-found-rate', type=float, default=0.0, help="HTTP 404 oranı")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--archive', action='store_true', help="Arşivdeki URL'leri kendi sayfalarıyla sun")
+    args = parser.parse_args()
+
+    replay_config = ReplayConfig(args.latency_ms, args.tail_ms, args.error_rate, args.throttle_rate,
+                                 args.not_found_rate, args.retry_after, args.seed)
+    server = create_server(replay_config, args.host, args.port, args.archive)
+    logger.info(f"Kaynak sunucu http://{args.host}:{args.port} adresinde ({len(server.pages)} sayfa, "
+                f"{len(server.archive)} arşiv URL'si): {replay_config.as_dict()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,76 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+from product_record import ProductRecord
+from scraper import scrape_website, normalize_product_url
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Önbellek ayarları
+SCRAPE_CACHE_TTL = int(os.getenv('SCRAPE_CACHE_TTL', '900'))  # saniye
+SCRAPE_CACHE_MAX_ENTRIES = int(os.getenv('SCRAPE_CACHE_MAX_ENTRIES', '1000'))
+
+class TTLCache:
+    """Süre sınırlı ve boyut sınırlı, thread-safe LRU önbellek"""
+
+    def __init__(self, max_entries: int = SCRAPE_CACHE_MAX_ENTRIES, ttl: float = SCRAPE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Süreç genelinde paylaşılan önbellekler (tüm Streamlit oturumları aynı modülü kullanır)
+scrape_results = TTLCache()
+conversion_results = TTLCache()
+
+async def cached_scrape_website(url: str, refresh: bool = False) -> List[ProductRecord]:
+    """scrape_website sonucunu normalize edilmiş URL'ye göre önbellekten getir"""
+    key = normalize_product_url(url)
+    if not refresh:
+        cached = scrape_results.get(key)
+        if cached is not None:
+            logger.info(f"Önbellekten getirildi: {key}")
+            return cached
+
+    result = await scrape_website(key)
+    # Başarısız sonuçlar önbelleğe alınmaz, bir sonraki denemede yeniden çekilir
+    if result:
+        scrape_results.set(key, result)
+    else:
+        scrape_results.invalidate(key)
+    return result
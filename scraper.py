@@ -1,10 +1,17 @@
+import asyncio
 import logging
-from typing import Dict, List, Any
+import os
+from typing import List, Optional
 import cloudscraper
 from bs4 import BeautifulSoup
 import json
 import re
-from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from circuit_breaker import CircuitBreaker
+from product_record import ProductRecord
+from page_archive import PAGE_ARCHIVE_ENABLED, archive_page
+from singleflight import SingleFlight
+from tracing import span, traced
 
 # Loglama yapılandırması
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +41,35 @@ def normalize_image_url(url: str) -> str:
 
     return url
 
+# Trendyol CDN'inde aynı görselin boyut/varyant kopyaları
+CDN_HOST = 'cdn.dsmcdn.com'
+CDN_RESIZE_PATTERN = re.compile(r'^/(?:mnresize|mresize|resize)/\d+/\d+(?=/)')
+CDN_SIZE_SUFFIX_PATTERN = re.compile(r'_org(?:_zoom)?(\.\w+)$')
+
+# Görsel benzerlik (perceptual hash) geçişi; görselleri indirdiği için varsayılan kapalı
+IMAGE_PHASH_ENABLED = os.getenv('IMAGE_PHASH', '0') == '1'
+
+# Sayfa isteği zaman aşımı (sn)
+SCRAPE_TIMEOUT = float(os.getenv('SCRAPE_TIMEOUT', '30'))
+
+# Yük testleri için: ayarlanırsa istekler aynı yol ile bu kaynağa (örn. http://127.0.0.1:8900) gönderilir
+SCRAPE_ORIGIN = os.getenv('SCRAPE_ORIGIN')
+
+# Host'un kendisinin sorunlu olduğunu gösteren yanıtlar (404 gibi URL'ye özgü hatalar sayılmaz)
+HOST_ERROR_STATUSES = (403, 429)
+
+def canonical_image_url(url: str) -> str:
+    """
+    CDN görsel URL'sini boyuttan bağımsız tek biçime indir
+    /mnresize/170/247/ty.../1_org.jpg ve /ty.../1_org_zoom.jpg aynı tam boyutlu görsele dönüşür
+    """
+    parts = urlsplit(url)
+    if parts.netloc.lower() != CDN_HOST:
+        return url
+    path = CDN_RESIZE_PATTERN.sub('', parts.path)
+    path = CDN_SIZE_SUFFIX_PATTERN.sub(r'_org_zoom\1', path)
+    return urlunsplit(('https', CDN_HOST, path, '', ''))
+
 def is_valid_trendyol_url(url: str) -> bool:
     """URL'nin geçerli bir Trendyol ürün linki olup olmadığını kontrol et"""
     try:
@@ -54,6 +90,23 @@ def is_valid_trendyol_url(url: str) -> bool:
         logger.error(f"URL doğrulama hatası: {str(e)}")
         return False
 
+# Önbellek anahtarında yok sayılan izleme parametreleri
+TRACKING_PARAMS = ('utm_', 'gclid', 'fbclid')
+
+def normalize_product_url(url: str) -> str:
+    """Aynı ürünü gösteren URL'leri tek bir biçime indir (önbellek anahtarı olarak kullanılır)"""
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit(('https', parts.netloc.lower(), parts.path.rstrip('/') or '/', urlencode(query), ''))
+
+@traced()
 def extract_title_from_html(soup: BeautifulSoup) -> str:
     """HTML'den başlık bilgisini çıkar"""
     try:
@@ -92,6 +145,7 @@ def extract_title_from_html(soup: BeautifulSoup) -> str:
         logger.error(f"Başlık çıkarma hatası: {str(e)}")
         return ""
 
+@traced()
 def extract_price_from_html(soup: BeautifulSoup) -> float:
     """HTML'den fiyat bilgisini çıkar"""
     try:
@@ -118,10 +172,8 @@ def extract_price_from_html(soup: BeautifulSoup) -> float:
                 price_text = price_text.replace(',', '.')
 
                 if price_text and float(price_text) > 0:
-                    # %10 markup ekle
-                    price = float(price_text) * 1.10
-                    # En fazla 2 ondalık basamak
-                    return round(price, 2)
+                    # Kaynak fiyat döndürülür, satış fiyatı pricing kurallarıyla hesaplanır
+                    return round(float(price_text), 2)
 
         # Script'lerden fiyat almayı dene
         scripts = soup.find_all('script', {'type': 'application/javascript'})
@@ -129,18 +181,29 @@ def extract_price_from_html(soup: BeautifulSoup) -> float:
             if script.string and 'window.__PRODUCT_DETAIL_APP_INITIAL_STATE__' in script.string:
                 match = re.search(r'"price":(\d+\.?\d*)', script.string)
                 if match:
-                    price = float(match.group(1))
-                    return round(price * 1.10, 2)
+                    return round(float(match.group(1)), 2)
 
         return 0.0
     except Exception as e:
         logger.error(f"Fiyat çıkarma hatası: {str(e)}")
         return 0.0
 
+@traced()
 def extract_images_from_html(soup: BeautifulSoup) -> List[str]:
     """HTML'den görsel URL'lerini çıkar"""
     try:
         images = []
+        seen = set()
+
+        def add_image(url: str) -> None:
+            # Farklı boyutlardaki kopyalar tek tam boyutlu URL'ye indirgenir
+            normalized_url = normalize_image_url(url)
+            if normalized_url:
+                canonical_url = canonical_image_url(normalized_url)
+                if canonical_url not in seen:
+                    seen.add(canonical_url)
+                    images.append(canonical_url)
+
         # Tüm olası görsel seçicileri
         img_selectors = [
             'img.detail-section-img',
@@ -165,9 +228,7 @@ def extract_images_from_html(soup: BeautifulSoup) -> List[str]:
                 for attr in ['src', 'data-src', 'data-original', 'data-lazy', 'data-zoom-image']:
                     src = img.get(attr)
                     if src:
-                        normalized_url = normalize_image_url(src)
-                        if normalized_url and normalized_url not in images:
-                            images.append(normalized_url)
+                        add_image(src)
 
         # Script'lerden görselleri çek
         scripts = soup.find_all('script', {'type': ['application/javascript', 'text/javascript']})
@@ -216,9 +277,7 @@ def extract_images_from_html(soup: BeautifulSoup) -> List[str]:
                                             continue
 
                                         if url and isinstance(url, str):
-                                            normalized_url = normalize_image_url(url)
-                                            if normalized_url and normalized_url not in images:
-                                                images.append(normalized_url)
+                                            add_image(url)
                         except json.JSONDecodeError:
                             continue
 
@@ -233,70 +292,56 @@ def extract_images_from_html(soup: BeautifulSoup) -> List[str]:
         logger.error(f"HTML'den görsel çıkarma hatası: {str(e)}")
         return []
 
-def extract_category_from_html(soup: BeautifulSoup) -> str:
-    """HTML'den kategori bilgisini çıkar"""
+# Ürün durumu JSON'undaki kategori nesnesi: {"id":73,"name":"T-Shirt","hierarchy":"Giyim/Üst Giyim/T-Shirt",...}
+CATEGORY_HIERARCHY_PATTERN = re.compile(r'"category":\{"id":\d+,"name":"(?:[^"\\]|\\.)*","hierarchy":"((?:[^"\\]|\\.)*)"')
+# Breadcrumb'daki marka filtreli liste bağlantıları (örn. /mavi-t-shirt-x-b43-c73) kategori değildir
+BRAND_LINK_PATTERN = re.compile(r'-b\d+(?:-|$)')
+CATEGORY_PATH_SEPARATOR = ' > '
+DEFAULT_CATEGORY = 'Giyim'
+
+@traced()
+def extract_category_path_from_html(soup: BeautifulSoup) -> List[str]:
+    """HTML'den kökten yaprağa kategori yolunu çıkar (örn. ['Giyim', 'Üst Giyim', 'T-Shirt'])"""
     try:
-        # Breadcrumb'dan kategori almayı dene
-        breadcrumb = soup.find('div', {'class': ['breadcrumb', 'product-categories']})
-        if breadcrumb:
-            links = breadcrumb.find_all('a')
-            if links:
-                return links[-1].get_text().strip()
-
-        # Script'lerden kategori almayı dene
+        # Ürün durumundaki tam hiyerarşiyi dene
         scripts = soup.find_all('script', {'type': 'application/javascript'})
         for script in scripts:
             if script.string and 'window.__PRODUCT_DETAIL_APP_INITIAL_STATE__' in script.string:
+                hierarchy_match = CATEGORY_HIERARCHY_PATTERN.search(script.string)
+                if hierarchy_match:
+                    hierarchy = json.loads(f'"{hierarchy_match.group(1)}"')
+                    path = [part.strip() for part in hierarchy.split('/') if part.strip()]
+                    if path:
+                        return path
                 category_match = re.search(r'"categoryName":"([^"]+)"', script.string)
                 if category_match:
-                    return category_match.group(1)
-
-        return 'Giyim'  # Varsayılan kategori
+                    return [category_match.group(1)]
+
+        # Breadcrumb'dan kategori yolunu almayı dene (son breadcrumb cinsiyetten bağımsız olandır)
+        breadcrumbs = soup.select('div.product-detail-breadcrumb, div.breadcrumb, div.product-categories')
+        if breadcrumbs:
+            path = [
+                link.get_text().strip() for link in breadcrumbs[-1].find_all('a')
+                if link.get('href') and link['href'] != '/' and not BRAND_LINK_PATTERN.search(link['href'])
+            ]
+            path = [name for name in path if name]
+            if path:
+                return path
+
+        return [DEFAULT_CATEGORY]  # Varsayılan kategori
     except Exception as e:
         logger.error(f"Kategori çıkarma hatası: {str(e)}")
-        return 'Giyim'
-
-async def scrape_website(url: str) -> List[Dict[str, Any]]:
-    """Trendyol'dan ürün verisi çek"""
-    try:
-        if not is_valid_trendyol_url(url):
-            logger.error(f"Geçersiz Trendyol URL'si: {url}")
-            return []
-
-        # URL'yi düzenle
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
+        return [DEFAULT_CATEGORY]
 
-        # Scraper oluştur
-        scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'mobile': False
-            }
-        )
-
-        # İstek başlıkları
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'tr,en-US;q=0.7,en;q=0.3',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache',
-            'DNT': '1'
-        }
-
-        try:
-            response = scraper.get(url, headers=headers, timeout=30)
-            if response.status_code != 200:
-                logger.error(f"Sayfa yüklenemedi: HTTP {response.status_code}")
-                return []
-        except Exception as e:
-            logger.error(f"Sayfa yükleme hatası: {str(e)}")
-            return []
+def extract_category_from_html(soup: BeautifulSoup) -> str:
+    """HTML'den kategori bilgisini (yolun son halkası) çıkar"""
+    return extract_category_path_from_html(soup)[-1]
 
-        # HTML parse et
-        soup = BeautifulSoup(response.text, 'html.parser')
+def parse_product_html(html: str) -> List[ProductRecord]:
+    """Ürün sayfası HTML'ini ayrıştır ve ürün verisini çıkar"""
+    try:
+        with span('scraper.soup', size=len(html)):
+            soup = BeautifulSoup(html, 'html.parser')
 
         # Başlık bul
         title = extract_title_from_html(soup)
@@ -312,20 +357,125 @@ async def scrape_website(url: str) -> List[Dict[str, Any]]:
 
         # Görsel ve kategori bilgilerini çek
         image_urls = extract_images_from_html(soup)
-        category = extract_category_from_html(soup)
+        category_path = extract_category_path_from_html(soup)
 
         # Sonuç oluştur
-        product_data = {
-            'title': title,
-            'price': price,
-            'image_urls': image_urls,
-            'properties': {},
-            'category': category
-        }
+        product_data = ProductRecord(
+            title=title,
+            price=price,
+            image_urls=image_urls,
+            properties={},
+            category=category_path[-1],
+            category_path=CATEGORY_PATH_SEPARATOR.join(category_path)
+        )
 
         logger.info("Veri başarıyla çıkarıldı")
         return [product_data]
 
+    except Exception as e:
+        logger.error(f"Ayrıştırma hatası: {str(e)}")
+        return []
+
+# Aynı URL için eşzamanlı scraping çağrılarını tek isteğe indirger
+scrape_flight = SingleFlight()
+
+async def scrape_website(url: str) -> List[ProductRecord]:
+    """Trendyol'dan ürün verisi çek (aynı URL için eşzamanlı çağrılar aynı sonucu bekler)"""
+    return await scrape_flight.do_async(normalize_product_url(url), lambda: scrape_product_page(url))
+
+def scrape_website_sync(url: str) -> List[ProductRecord]:
+    """scrape_website'ın thread'li çağıranlar için senkron karşılığı"""
+    return scrape_flight.do(normalize_product_url(url), lambda: scrape_product_page_sync(url))
+
+# Hata oranı yükselen host'lara bir süre istek gönderilmez
+host_breaker = CircuitBreaker()
+
+def fetch_html(url: str) -> Optional[str]:
+    """Sayfayı tarayıcı gibi davranan istemciyle indir; başarısız olursa None döndür (bloklayan çağrı)"""
+    # URL'yi düzenle
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    if SCRAPE_ORIGIN:
+        origin = urlsplit(SCRAPE_ORIGIN)
+        url = urlunsplit(urlsplit(url)._replace(scheme=origin.scheme, netloc=origin.netloc))
+
+    host = urlsplit(url).netloc.lower()
+    if not host_breaker.allow(host):
+        logger.warning(f"Devre açık, istek gönderilmedi: {url}")
+        return None
+
+    # İstek başlıkları
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'tr,en-US;q=0.7,en;q=0.3',
+        'Cache-Control': 'no-cache',
+        'Pragma': 'no-cache',
+        'DNT': '1'
+    }
+
+    # Yarı açık devrede bu istek deneme isteğidir; her sonuç record() ile kaydedilmeli, yoksa devre kilitlenir
+    try:
+        # Scraper oluştur
+        scraper = cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'windows',
+                'mobile': False
+            }
+        )
+
+        with span('scraper.fetch', url=url) as fetch_span:
+            response = scraper.get(url, headers=headers, timeout=SCRAPE_TIMEOUT)
+            fetch_span.set(status_code=response.status_code, size=len(response.content))
+        host_breaker.record(host, response.status_code < 500 and response.status_code not in HOST_ERROR_STATUSES)
+        if response.status_code != 200:
+            logger.error(f"Sayfa yüklenemedi: HTTP {response.status_code}")
+            return None
+    except Exception as e:
+        # Zaman aşımı ve bağlantı hataları host hatası sayılır
+        host_breaker.record(host, False)
+        logger.error(f"Sayfa yükleme hatası: {str(e)}")
+        return None
+
+    return response.text
+
+def fetch_product_html(url: str) -> Optional[str]:
+    """Ürün sayfasını indir ve arşivle; başarısız olursa None döndür (bloklayan çağrı)"""
+    if not is_valid_trendyol_url(url):
+        logger.error(f"Geçersiz Trendyol URL'si: {url}")
+        return None
+
+    html = fetch_html(url)
+    if html is not None and PAGE_ARCHIVE_ENABLED:
+        # Arşiv, ürünlerin kaydedildiği haliyle istenen URL'yi anahtar olarak kullanır
+        try:
+            archive_page(url, html)
+        except Exception as e:
+            logger.warning(f"Sayfa arşivlenemedi ({url}): {str(e)}")
+
+    return html
+
+def scrape_product_page_sync(url: str) -> List[ProductRecord]:
+    """Ürün sayfasını çek ve ayrıştır (bloklayan çağrı)"""
+    try:
+        html = fetch_product_html(url)
+        if html is None:
+            return []
+
+        # HTML parse et
+        with span('scraper.parse', url=url):
+            products = parse_product_html(html)
+
+        if products and IMAGE_PHASH_ENABLED:
+            from image_dedupe import dedupe_record_images
+            products = dedupe_record_images(products)
+        return products
+
     except Exception as e:
         logger.error(f"Scraping hatası: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+async def scrape_product_page(url: str) -> List[ProductRecord]:
+    """Ürün sayfasını çek ve ayrıştır; indirme ve ayrıştırma event loop'u bloklamamak için thread'de çalışır"""
+    return await asyncio.to_thread(scrape_product_page_sync, url)
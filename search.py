@@ -0,0 +1,94 @@
+import logging
+import re
+from typing import Any, Dict, Optional
+from sqlalchemy import Float, Integer, column, func, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+from database import Product, Variant, SEARCH_DOCUMENT_SQL, SEARCH_TS_CONFIG
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEARCH_MAX_PER_PAGE = 100
+
+# FTS5'te başlık eşleşmeleri açıklamadan, kategori eşleşmeleri ikisinin arasında ağırlıklıdır
+FTS5_WEIGHTS = (10.0, 1.0, 5.0)
+
+def fts5_query(query: str) -> str:
+    """Kullanıcı metnini güvenli FTS5 sorgusuna çevir: her kelime önek olarak aranır, hepsi eşleşmeli"""
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_products(db: Session, query: str, in_stock: Optional[bool] = None,
+                    min_price: Optional[float] = None, max_price: Optional[float] = None,
+                    page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    """
+    Başlık, açıklama ve kategoride tam metin arama
+    Sonuçlar alaka sırasıyla, stok ve (satış) fiyat aralığı filtreleriyle sayfalı döner
+    """
+    page = max(page, 1)
+    per_page = max(1, min(per_page, SEARCH_MAX_PER_PAGE))
+    # Ürün fiyatı en ucuz varyantın fiyatıdır; ilişkili alt sorgu yalnızca eşleşen ürünler için çalışır
+    price = (
+        select(func.min(Variant.current_price))
+        .where(Variant.product_id == Product.id)
+        .correlate(Product)
+        .scalar_subquery()
+    )
+
+    dialect = db.bind.dialect.name
+    if dialect == 'postgresql':
+        document = literal_column(SEARCH_DOCUMENT_SQL)
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_TS_CONFIG}'"), query)
+        rank = func.ts_rank_cd(document, tsquery)
+        statement = select(Product, price.label('price'), rank.label('rank')).where(document.op('@@')(tsquery))
+    elif dialect == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return {'query': query, 'page': page, 'per_page': per_page, 'total': 0, 'results': []}
+        weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+        fts = (
+            text(f"SELECT rowid AS product_id, -bm25(products_fts, {weights}) AS rank "
+                 "FROM products_fts WHERE products_fts MATCH :match")
+            .bindparams(match=match)
+            .columns(column('product_id', Integer), column('rank', Float))
+            .subquery('fts')
+        )
+        rank = fts.c.rank
+        statement = select(Product, price.label('price'), rank.label('rank')).join(fts, fts.c.product_id == Product.id)
+    else:
+        # Tam metin indeksi olmayan veritabanları için sırasız LIKE araması
+        pattern = f"%{query}%"
+        rank = literal_column('0')
+        statement = select(Product, price.label('price'), rank.label('rank')).where(or_(
+            Product.title.ilike(pattern), Product.description.ilike(pattern), Product.category.ilike(pattern)
+        ))
+
+    if in_stock is not None:
+        statement = statement.where(Product.stock_status.is_(in_stock))
+    if min_price is not None:
+        statement = statement.where(price >= min_price)
+    if max_price is not None:
+        statement = statement.where(price <= max_price)
+
+    total = db.execute(select(func.count()).select_from(statement.subquery())).scalar()
+    rows = db.execute(
+        statement.order_by(rank.desc(), Product.id).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+
+    return {
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'results': [{
+            'id': product.id,
+            'title': product.title,
+            'category': product.category,
+            'price': price,
+            'stock_status': product.stock_status,
+            'image_url': product.image_url,
+            'source_url': product.source_url,
+            'rank': round(float(score), 4) if score is not None else None,
+        } for product, price, score in rows],
+    }
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı çağrıları tek bir işe indirger
+    İlk çağıran işi yapar, diğerleri (farklı thread veya event loop'ta olsalar bile) aynı sonucu bekler
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Anahtar için devam eden çağrıya katıl; yoksa yeni bir çağrı başlat (leader=True)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async çağıranlar için: işi yap veya devam eden işin sonucunu bekle"""
+        future, leader = self._join(key)
+        if not leader:
+            logger.info(f"Devam eden istek bekleniyor: {key}")
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+            raise
+        self._finish(key, future)
+        future.set_result(result)
+        return result
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Thread'li çağıranlar için: işi yap veya devam eden işin sonucunu bekle"""
+        future, leader = self._join(key)
+        if not leader:
+            logger.info(f"Devam eden istek bekleniyor: {key}")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+            raise
+        self._finish(key, future)
+        future.set_result(result)
+        return result
+
+    def in_flight(self) -> int:
+        """Devam eden çağrı sayısı"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+import pytest
+
+# database modülü içe aktarılırken DATABASE_URL okunur; testler geçici bir SQLite veritabanı kullanır
+TEST_DB = Path(tempfile.mkdtemp()) / 'trendyfetch_test.db'
+os.environ['DATABASE_URL'] = f'sqlite:///{TEST_DB}'
+os.environ.setdefault('PAGE_ARCHIVE', '0')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Base, engine, get_db, init_db
+
+init_db()
+
+@pytest.fixture
+def db():
+    """Her test boş tablolarla başlar"""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    session = next(get_db())
+    try:
+        yield session
+    finally:
+        session.close()
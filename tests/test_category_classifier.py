@@ -0,0 +1,68 @@
+import os
+import pandas as pd
+from category_classifier import (
+    DEFAULT_PRODUCT_TYPE, DEFAULT_SHOPIFY_CATEGORY, CategoryClassifier, load_category_classifier, split_path,
+)
+
+ROWS = [
+    ('Giyim', 'Apparel', 'Clothing'),
+    ('Giyim > Üst Giyim', 'Apparel > Tops', 'Top'),
+    ('Giyim > Üst Giyim > T-Shirt', 'Apparel > Tops > T-Shirts', 'T-Shirt'),
+    ('Ev & Mobilya > Ev > Banyo', 'Home > Bathroom', 'Bath'),
+    ('Eşofman Altı', 'Apparel > Activewear > Sweatpants', 'Sweatpants'),
+    ('Bornoz', 'Home > Bathroom > Bathrobes', 'Bathrobe'),
+]
+
+def test_split_path_normalizes_turkish_case_and_separators():
+    assert split_path('EV VE MOBİLYA / Ev >  Banyo') == ('ev ve mobilya', 'ev', 'banyo')
+    assert split_path('Ev & Mobilya') == ('ev ve mobilya',)
+    assert split_path(['Giyim', '', None, 'ŞORT']) == ('giyim', 'sort')
+    assert split_path(None) == ()
+
+def test_longest_prefix_match_wins():
+    classifier = CategoryClassifier(ROWS)
+    assert classifier.classify('Giyim > Üst Giyim > T-Shirt') == ('Apparel > Tops > T-Shirts', 'T-Shirt')
+    # Eşleşmeyen derin halkalarda en uzun eşleşen öneke düşülür
+    assert classifier.classify('Giyim > Üst Giyim > Crop') == ('Apparel > Tops', 'Top')
+    assert classifier.classify('Giyim > Aksesuar') == ('Apparel', 'Clothing')
+    assert classifier.classify('ev ve mobilya/ev/banyo') == ('Home > Bathroom', 'Bath')
+    assert classifier.classify(['Giyim', 'Üst Giyim']) == ('Apparel > Tops', 'Top')
+
+def test_name_fallback_on_deeper_segment():
+    classifier = CategoryClassifier(ROWS)
+    # Önekten daha derin halkadaki ad eşleşmesi önekten önce gelir
+    assert classifier.classify('Giyim > Alt Giyim > Eşofman Altı') == ('Apparel > Activewear > Sweatpants', 'Sweatpants')
+    assert classifier.classify('Ev & Mobilya > Ev > Banyo > Bornoz') == ('Home > Bathroom > Bathrobes', 'Bathrobe')
+    # Kökten eşleşme olmasa da ad tek başına eşleşir
+    assert classifier.classify('Spor > Eşofman Altı') == ('Apparel > Activewear > Sweatpants', 'Sweatpants')
+    assert classifier.classify('Bornoz') == ('Home > Bathroom > Bathrobes', 'Bathrobe')
+
+def test_unknown_and_empty_paths_use_default():
+    classifier = CategoryClassifier(ROWS)
+    default = (DEFAULT_SHOPIFY_CATEGORY, DEFAULT_PRODUCT_TYPE)
+    assert classifier.classify('Elektronik > Telefon') == default
+    assert classifier.classify('') == default
+    assert classifier.classify(None) == default
+
+def test_classify_series_matches_single_classification():
+    classifier = CategoryClassifier(ROWS)
+    paths = pd.Series(['Giyim > Üst Giyim', None, 'Spor > Eşofman Altı', 'Giyim > Üst Giyim', 42], index=[5, 6, 7, 8, 9])
+    frame = classifier.classify_series(paths)
+    assert frame.index.tolist() == [5, 6, 7, 8, 9]
+    expected = [classifier.classify(path if isinstance(path, str) else None) for path in paths]
+    assert list(zip(frame['Product Category'], frame['Type'])) == expected
+
+def test_mapping_file_is_reloaded_when_it_changes(tmp_path):
+    mapping = tmp_path / 'mapping.csv'
+    mapping.write_text('path,shopify_category,product_type\nGiyim,Apparel,Clothing\n', encoding='utf-8')
+    first = load_category_classifier(mapping)
+    assert load_category_classifier(mapping) is first
+    assert first.classify('Giyim') == ('Apparel', 'Clothing')
+
+    mapping.write_text('path,shopify_category,product_type\nGiyim,Clothing,Wear\n', encoding='utf-8')
+    stat = mapping.stat()
+    os.utime(mapping, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_category_classifier(mapping).classify('Giyim') == ('Clothing', 'Wear')
+
+    missing = load_category_classifier(tmp_path / 'yok.csv')
+    assert missing.classify('Giyim') == (DEFAULT_SHOPIFY_CATEGORY, DEFAULT_PRODUCT_TYPE)
@@ -0,0 +1,60 @@
+import time
+from circuit_breaker import CircuitBreaker
+
+HOST = 'www.trendyol.com'
+COOLDOWN = 0.05
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(error_rate=0.5, min_requests=4, window=60, cooldown=COOLDOWN)
+    for ok in (True, False, True, False):
+        breaker.record(HOST, ok)
+    return breaker
+
+def state(breaker: CircuitBreaker) -> str:
+    return breaker.as_dict()[HOST]['state']
+
+def test_closed_breaker_needs_min_requests_before_opening():
+    breaker = CircuitBreaker(error_rate=0.5, min_requests=4, window=60, cooldown=COOLDOWN)
+    for _ in range(3):
+        breaker.record(HOST, False)
+    assert state(breaker) == 'closed'
+    assert breaker.allow(HOST)
+
+def test_closed_open_half_open_closed():
+    breaker = open_breaker()
+    assert state(breaker) == 'open'
+    assert breaker.is_open(HOST)
+    assert not breaker.allow(HOST)
+
+    time.sleep(COOLDOWN)
+    assert state(breaker) == 'half-open'
+    # Yarı açık durumda yalnızca tek deneme isteğine izin verilir
+    assert breaker.allow(HOST)
+    assert not breaker.allow(HOST)
+    assert breaker.is_open(HOST)
+
+    breaker.record(HOST, True)
+    assert state(breaker) == 'closed'
+    assert breaker.as_dict()[HOST]['requests'] == 0
+    assert breaker.allow(HOST)
+
+def test_failed_probe_reopens():
+    breaker = open_breaker()
+    time.sleep(COOLDOWN)
+    assert breaker.allow(HOST)
+
+    breaker.record(HOST, False)
+    assert state(breaker) == 'open'
+    assert not breaker.allow(HOST)
+
+def test_results_of_requests_sent_before_opening_are_ignored():
+    breaker = open_breaker()
+    breaker.record(HOST, True)
+    assert state(breaker) == 'open'
+
+def test_hosts_are_independent_and_reset_closes_all():
+    breaker = open_breaker()
+    assert breaker.allow('cdn.dsmcdn.com')
+    breaker.reset()
+    assert breaker.allow(HOST)
+    assert breaker.as_dict() == {HOST: {'state': 'closed', 'requests': 0, 'failures': 0}}
@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime
+import pandas as pd
+import api_service
+import scraper
+from data_processor import persist_products, prepare_items
+from delta_export import build_delta_frame, find_changed_product_ids
+from product_record import ProductRecord
+
+PRODUCT_URL = 'https://www.trendyol.com/marka/urun-p-123'
+
+def scraped_record(image_urls):
+    return ProductRecord(title='Ürün', price=100.0, image_urls=image_urls, category='Giyim',
+                         source_url=PRODUCT_URL)
+
+def test_change_to_a_later_image_is_exported_as_delta(db, monkeypatch):
+    scraper.host_breaker.reset()
+    first = ['https://cdn.dsmcdn.com/a.jpg', 'https://cdn.dsmcdn.com/b.jpg']
+    [product_id] = persist_products(prepare_items([scraped_record(first)]), PRODUCT_URL)
+    since = datetime.utcnow()
+    assert find_changed_product_ids(db, since) == []
+
+    # Yalnızca ikinci görsel değişir, fiyat ve ilk görsel aynı kalır
+    second = ['https://cdn.dsmcdn.com/a.jpg', 'https://cdn.dsmcdn.com/c.jpg']
+
+    async def fake_scrape_website(url):
+        return [scraped_record(second)]
+
+    monkeypatch.setattr(api_service, 'scrape_website', fake_scrape_website)
+    assert asyncio.run(api_service.refresh_products_async())['updated'] == 1
+
+    assert find_changed_product_ids(db, since) == [product_id]
+    frame = build_delta_frame(db, [product_id])
+    assert frame['Image Src'].tolist() == second
+    assert frame['Database_ID'].tolist() == [product_id, product_id]
@@ -0,0 +1,36 @@
+import asyncio
+import pipeline
+from database import Product
+from product_record import ProductRecord
+
+def record(index: int, price: float = 100.0) -> ProductRecord:
+    return ProductRecord(title=f'Ürün {index}', price=price, image_urls=[f'https://cdn.dsmcdn.com/{index}.jpg'],
+                         category='Giyim', source_url=f'https://www.trendyol.com/marka/urun-p-{index}')
+
+def test_bad_row_fails_alone_in_batch_write(db, monkeypatch):
+    db.add(Product(title='Ürün 0', source_url=record(0).source_url, source_price=90.0))
+    db.commit()
+
+    build_product_models = pipeline.build_product_models
+
+    def failing_build(item):
+        product = build_product_models(item)
+        if product.source_url.endswith('-p-2'):
+            product.title = None  # NOT NULL kısıtı bu satırı düşürür
+        return product
+
+    monkeypatch.setattr(pipeline, 'build_product_models', failing_build)
+
+    counts = asyncio.run(pipeline.persist_batch_async([record(0, 120.0), record(1), record(2), record(3)]))
+
+    assert counts == {'inserted': 2, 'updated': 1, 'failed': 1}
+    db.expire_all()
+    saved = {product.source_url.rsplit('-', 1)[1]: product for product in db.query(Product)}
+    assert sorted(saved) == ['0', '1', '3']
+    assert saved['0'].source_price == 120.0
+    assert [image.image_url for image in saved['1'].images] == ['https://cdn.dsmcdn.com/1.jpg']
+
+def test_clean_batch_is_written_in_one_pass(db):
+    counts = asyncio.run(pipeline.persist_batch_async([record(1), record(2), record(1)]))
+    assert counts == {'inserted': 2, 'updated': 0, 'failed': 0}
+    assert db.query(Product).count() == 2
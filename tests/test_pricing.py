@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from database import Product, Variant
+from pricing import PricingRules, compute_sell_prices, reprice_catalog, sell_price
+
+BANDS = [{'max': 100, 'markup': 40}, {'max': 500, 'markup': 25}, {'max': 2000, 'markup': 15}]
+CATEGORIES = {'Elektronik': 5, 'Giyim': 30}
+# Her bandın içi ve sınırları, bantların üstü ve geçersiz fiyatlar
+PRICES = [0.5, 1, 49.99, 99.99, 100, 100.01, 250, 499.99, 500, 1999.99, 2000, 2000.01, 15000, 0, -5, None, 'abc']
+
+@pytest.mark.parametrize('rounding', ['cents', 'charm', 'step:5', 'step:0.5'])
+def test_vectorized_prices_match_single_price_for_every_band_and_category(rounding):
+    rules = PricingRules(default_markup=10, categories=CATEGORIES, price_bands=BANDS, rounding=rounding)
+    rows = [(price, category) for price in PRICES for category in [None, 'Elektronik', 'Giyim', 'Bilinmeyen']]
+    prices = pd.Series([price for price, _ in rows], dtype=object)
+    categories = pd.Series([category for _, category in rows], dtype=object)
+
+    vectorized = compute_sell_prices(prices, categories, rules).tolist()
+    single = [sell_price(price, category, rules) for price, category in rows]
+
+    assert vectorized == pytest.approx(single)
+
+def test_markup_priority_and_rounding():
+    rules = PricingRules(default_markup=10, categories=CATEGORIES, price_bands=BANDS)
+    assert sell_price(50, None, rules) == 70.0  # bant: %40
+    assert sell_price(100, None, rules) == 125.0  # sınır bir üst banda düşer: %25
+    assert sell_price(5000, None, rules) == 5500.0  # bant yok: varsayılan %10
+    assert sell_price(50, 'Elektronik', rules) == 52.5  # kategori bandı geçersiz kılar
+    assert sell_price(0, 'Giyim', rules) == 0.0
+
+    assert sell_price(10, None, PricingRules(default_markup=10, rounding='charm')) == 11.99
+    assert sell_price(10, None, PricingRules(default_markup=10, rounding='step:5')) == 15.0
+    assert sell_price(10, None, PricingRules(default_markup=0, rounding='charm')) == 10.99
+
+@pytest.mark.parametrize('rounding', ['yukarı', 'step:0'])
+def test_invalid_rounding_rejected(rounding):
+    with pytest.raises(ValueError):
+        PricingRules(rounding=rounding)
+
+def test_reprice_catalog_writes_only_changed_variants(db):
+    rules = PricingRules(default_markup=10, categories={'Giyim': 30})
+    unchanged = Product(title='A', source_price=100.0, category='Elektronik',
+                        variants=[Variant(sku='a', current_price=110.0, stock=1)])
+    changed = Product(title='B', source_price=100.0, category='Giyim',
+                      variants=[Variant(sku='b', current_price=110.0, stock=1)])
+    legacy = Product(title='C', source_price=None, variants=[Variant(sku='c', current_price=55.0, stock=1)])
+    db.add_all([unchanged, changed, legacy])
+    db.commit()
+    unchanged_updated_at = unchanged.updated_at
+
+    assert reprice_catalog(rules, dry_run=True) == {'variants': 2, 'changed': 1, 'products': 1}
+    assert reprice_catalog(rules) == {'variants': 2, 'changed': 1, 'products': 1}
+
+    db.expire_all()
+    assert changed.variants[0].current_price == 130.0
+    assert unchanged.variants[0].current_price == 110.0
+    assert unchanged.updated_at == unchanged_updated_at
+    assert legacy.variants[0].current_price == 55.0
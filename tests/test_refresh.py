@@ -0,0 +1,36 @@
+import asyncio
+import threading
+import time
+import api_service
+import scraper
+from database import Product
+from product_record import ProductRecord
+
+def test_refresh_fetches_products_concurrently(db, monkeypatch):
+    scraper.host_breaker.reset()
+    for index in range(4):
+        db.add(Product(title='Ürün', source_url=f'https://www.trendyol.com/marka/urun-p-{index}', source_price=10.0))
+    db.commit()
+
+    active = []
+    overlap = []
+    lock = threading.Lock()
+
+    def slow_fetch(url):
+        with lock:
+            active.append(url)
+            overlap.append(len(active))
+        time.sleep(0.2)
+        with lock:
+            active.remove(url)
+        return '<html></html>'
+
+    monkeypatch.setattr(scraper, 'fetch_product_html', slow_fetch)
+    monkeypatch.setattr(scraper, 'parse_product_html', lambda html: [ProductRecord(title='Ürün', price=12.0)])
+
+    result = asyncio.run(api_service.refresh_products_async(concurrency=2))
+
+    assert result == {'updated': 4, 'failed': 0, 'skipped': 0, 'deferred': 0}
+    assert max(overlap) == 2
+    db.expire_all()
+    assert {product.source_price for product in db.query(Product)} == {12.0}
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+import time
+import scraper
+from circuit_breaker import CircuitBreaker
+from product_record import ProductRecord
+
+PRODUCT_URL = 'https://www.trendyol.com/marka/urun-p-123'
+
+def test_concurrent_scrapes_on_one_loop_share_a_fetch(monkeypatch):
+    fetches = []
+
+    def slow_fetch(url):
+        fetches.append(threading.current_thread().name)
+        time.sleep(0.3)
+        return '<html></html>'
+
+    monkeypatch.setattr(scraper, 'fetch_product_html', slow_fetch)
+    monkeypatch.setattr(scraper, 'parse_product_html', lambda html: [ProductRecord(title='Ürün', price=10.0)])
+
+    async def scrape_many():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(scraper.scrape_website(PRODUCT_URL) for _ in range(5)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(scrape_many())
+
+    assert len(fetches) == 1
+    assert fetches[0] != threading.main_thread().name
+    assert all(result and result[0].title == 'Ürün' for result in results)
+    assert elapsed < 0.3 * 2
+
+def test_scraper_setup_error_releases_half_open_probe(monkeypatch):
+    breaker = CircuitBreaker(min_requests=1, cooldown=0)
+    monkeypatch.setattr(scraper, 'host_breaker', breaker)
+    breaker.record('www.trendyol.com', False)
+    assert breaker.as_dict()['www.trendyol.com']['state'] == 'half-open'
+
+    def broken_create_scraper(**kwargs):
+        raise RuntimeError('cloudscraper başlatılamadı')
+
+    monkeypatch.setattr(scraper.cloudscraper, 'create_scraper', broken_create_scraper)
+
+    assert scraper.fetch_html(PRODUCT_URL) is None
+    # Deneme isteği başarısız sayılır; devre kilitli kalmaz, sonraki istek yeniden deneme hakkı alır
+    assert breaker.allow('www.trendyol.com')
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from singleflight import SingleFlight
+
+def test_threaded_callers_share_one_result():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return ['sonuç']
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(lambda _: flight.do('anahtar', work), range(5)))
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+def test_threaded_callers_share_one_exception():
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(3)
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError('çekilemedi')
+
+    def call(_):
+        barrier.wait()
+        with pytest.raises(ValueError, match='çekilemedi'):
+            flight.do('anahtar', work)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        list(executor.map(call, range(3)))
+
+    assert calls == [1]
+    assert flight.in_flight() == 0
+
+def test_async_callers_share_result_and_exception():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def failing_work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        raise ValueError('çekilemedi')
+
+    async def run():
+        shared = await asyncio.gather(*(flight.do_async('a', work) for _ in range(4)))
+        errors = await asyncio.gather(*(flight.do_async('b', failing_work) for _ in range(4)),
+                                      return_exceptions=True)
+        return shared, errors
+
+    shared, errors = asyncio.run(run())
+
+    assert shared == [1, 1, 1, 1]
+    assert len(calls) == 2
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flight.in_flight() == 0
+
+def test_new_call_after_completion_runs_again():
+    flight = SingleFlight()
+    assert flight.do('anahtar', lambda: 1) == 1
+    assert flight.do('anahtar', lambda: 2) == 2
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import api_service
+from database import Product, UrlFailure
+from product_record import ProductRecord
+from scraper import host_breaker
+from url_health import URL_DEAD_AFTER, record_failure
+
+PRODUCT_URL = 'https://www.trendyol.com/marka/urun-p-123'
+
+@pytest.fixture(autouse=True)
+def reset_breaker():
+    host_breaker.reset()
+
+def scraped(monkeypatch, record):
+    async def fake_scrape_website(url):
+        return [record]
+    monkeypatch.setattr(api_service, 'scrape_website', fake_scrape_website)
+
+def add_dead_product(db, next_check_at):
+    product = Product(title='Ürün', source_url=PRODUCT_URL, stock_status=True, source_price=100.0)
+    db.add(product)
+    db.flush()
+    failure = None
+    for _ in range(URL_DEAD_AFTER):
+        failure = record_failure(failure, product, 'Veri çekilemedi')
+    failure.next_check_at = next_check_at
+    db.add(failure)
+    db.commit()
+    assert failure.dead and product.stock_status is False
+    return product.id
+
+def test_dead_url_back_in_stock_after_successful_scrape(db, monkeypatch):
+    product_id = add_dead_product(db, datetime.utcnow() - timedelta(minutes=1))
+    scraped(monkeypatch, ProductRecord(title='Ürün', price='120 TL'))
+
+    result = asyncio.run(api_service.refresh_products_async())
+
+    assert result['updated'] == 1 and result['failed'] == 0
+    db.expire_all()
+    product = db.get(Product, product_id)
+    assert product.stock_status is True
+    assert product.source_price == 120.0
+    assert db.query(UrlFailure).count() == 0
+
+def test_dead_url_keeps_scraped_stock_status(db, monkeypatch):
+    product_id = add_dead_product(db, datetime.utcnow() - timedelta(minutes=1))
+    scraped(monkeypatch, ProductRecord(title='Ürün', price='120 TL', stock_status=False))
+
+    asyncio.run(api_service.refresh_products_async())
+
+    db.expire_all()
+    assert db.get(Product, product_id).stock_status is False
+    assert db.query(UrlFailure).count() == 0
+
+def test_skipped_count_ignores_orphan_failures(db, monkeypatch):
+    add_dead_product(db, datetime.utcnow() + timedelta(hours=1))
+    db.add(UrlFailure(url='https://www.trendyol.com/silinmis/urun-p-999', failure_count=1,
+                      next_check_at=datetime.utcnow() + timedelta(hours=1)))
+    db.commit()
+    scraped(monkeypatch, ProductRecord(title='Ürün', price='120 TL'))
+
+    result = asyncio.run(api_service.refresh_products_async())
+
+    assert result == {'updated': 0, 'failed': 0, 'skipped': 1, 'deferred': 0}
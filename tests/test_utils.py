@@ -0,0 +1,72 @@
+import codecs
+import gzip
+import json
+from io import BytesIO
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from utils import export_csv_to_file, export_data, export_jsonl_to_file, export_parquet_to_file, read_export
+
+def export_frame(rows: int = 10) -> pd.DataFrame:
+    return pd.DataFrame({
+        'Handle': [f'urun-{index}' for index in range(rows)],
+        'Title': [f'Ürün {index}' if index % 3 else '' for index in range(rows)],
+        'Variant Price': [str(10.5 + index) if index % 4 else '' for index in range(rows)],
+        'Image Position': [str(index % 3 + 1) for index in range(rows)],
+        'Database_ID': [str(index) if index % 2 else '' for index in range(rows)],
+    })
+
+def test_jsonl_export_is_valid_json_lines_across_chunks():
+    df = export_frame(10)
+    buffer = BytesIO()
+    export_jsonl_to_file(df, buffer, chunk_rows=3)
+
+    lines = gzip.decompress(buffer.getvalue()).decode('utf-8').split('\n')
+    assert lines[-1] == ''
+    records = [json.loads(line) for line in lines[:-1]]
+    assert [record['Handle'] for record in records] == df['Handle'].tolist()
+
+    buffer.seek(0)
+    restored = read_export(buffer, 'jsonl')
+    assert restored['Handle'].tolist() == df['Handle'].tolist()
+    assert restored['Variant Price'].tolist()[1:4] == pytest.approx([11.5, 12.5, 13.5])
+    assert restored['Database_ID'].isna().tolist() == (df['Database_ID'] == '').tolist()
+
+def test_csv_export_round_trip_across_chunks():
+    df = export_frame(10)
+    df.loc[2, 'Title'] = 'Çok satırlı\nbaşlık,  "tırnaklı"'
+    df.loc[5, 'Handle'] = None
+    buffer = BytesIO()
+    written = export_csv_to_file(df, buffer, chunk_rows=3)
+
+    content = buffer.getvalue()
+    assert written == len(content)
+    assert content.startswith(codecs.BOM_UTF8)
+    assert content.count(b'"Handle"') == 1
+    assert content == export_data(df, 'csv')
+
+    buffer.seek(0)
+    restored = pd.read_csv(buffer, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    expected = df.fillna('').astype(str)
+    expected.loc[2, 'Title'] = 'Çok satırlı başlık, "tırnaklı"'
+    pd.testing.assert_frame_equal(restored, expected)
+
+@pytest.mark.parametrize('format_type', ['parquet', 'arrow', 'jsonl'])
+def test_columnar_export_round_trip_keeps_types(format_type):
+    df = export_frame(10)
+    content = export_data(df, format_type)
+    restored = read_export(BytesIO(content), format_type)
+
+    assert restored['Handle'].tolist() == df['Handle'].tolist()
+    assert pd.api.types.is_string_dtype(restored['Handle'])
+    assert restored['Variant Price'].dtype == 'float64'
+    assert str(restored['Image Position'].dtype) == 'Int64'
+    assert str(restored['Database_ID'].dtype) == 'Int64'
+    assert restored['Variant Price'].isna().tolist() == (df['Variant Price'] == '').tolist()
+    assert restored['Image Position'].tolist() == [int(value) for value in df['Image Position']]
+
+def test_parquet_export_writes_one_row_group_per_chunk():
+    buffer = BytesIO()
+    export_parquet_to_file(export_frame(10), buffer, chunk_rows=3)
+    buffer.seek(0)
+    assert pq.ParquetFile(buffer).num_row_groups == 4
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+import work_queue
+from database import ScrapeJob
+from work_queue import (
+    DONE, FAILED, PENDING, RUNNING, claim_jobs, complete_job, enqueue_urls, fail_job, heartbeat, queue_stats,
+)
+
+URLS = [f'https://www.trendyol.com/marka/urun-p-{index}' for index in range(5)]
+
+def expire_leases(db, *job_ids):
+    db.execute(
+        update(ScrapeJob).where(ScrapeJob.id.in_(job_ids))
+        .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.commit()
+
+def make_available(db, *job_ids):
+    db.execute(
+        update(ScrapeJob).where(ScrapeJob.id.in_(job_ids))
+        .values(available_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.commit()
+
+def test_enqueue_skips_duplicates_and_active_jobs(db):
+    assert enqueue_urls(URLS[:3] + [URLS[0], '  ', None]) == 3
+    assert enqueue_urls(URLS) == 2
+    assert queue_stats(db) == {PENDING: 5}
+
+def test_claimed_jobs_are_leased_to_one_worker(db):
+    enqueue_urls(URLS)
+    first = claim_jobs(db, 'isci-1', 3)
+    second = claim_jobs(db, 'isci-2', 3)
+
+    assert [job.url for job in first] == URLS[:3]
+    assert [job.url for job in second] == URLS[3:]
+    assert {job.status for job in first + second} == {RUNNING}
+    assert {job.attempts for job in first + second} == {1}
+    assert len({job.lease_token for job in first} | {job.lease_token for job in second}) == 2
+    assert claim_jobs(db, 'isci-3', 3) == []
+
+def test_expired_lease_is_reclaimed_and_stale_worker_loses_it(db):
+    enqueue_urls(URLS[:1])
+    [stale] = claim_jobs(db, 'isci-1', 1)
+    stale_token = stale.lease_token
+    db.expunge(stale)
+
+    # Kirası süren iş başka işçiye verilmez; heartbeat kirayı uzatır
+    assert claim_jobs(db, 'isci-2', 1) == []
+    assert heartbeat(db, [stale.id], 'isci-1') == 1
+
+    expire_leases(db, stale.id)
+    [reclaimed] = claim_jobs(db, 'isci-2', 1)
+    assert reclaimed.id == stale.id
+    assert reclaimed.attempts == 2
+    assert reclaimed.leased_by == 'isci-2'
+    assert reclaimed.lease_token != stale_token
+
+    # Eski işçinin sonuçları ve heartbeat'i artık geçersiz
+    assert heartbeat(db, [stale.id], 'isci-1') == 0
+    assert not complete_job(db, stale, product_id=None)
+    assert not fail_job(db, stale, 'zaman aşımı')
+    assert complete_job(db, reclaimed, product_id=None)
+    db.expire_all()
+    assert queue_stats(db) == {DONE: 1}
+
+def test_failed_job_is_retried_until_attempts_run_out(db, monkeypatch):
+    monkeypatch.setattr(work_queue, 'MAX_ATTEMPTS', 2)
+    enqueue_urls(URLS[:1])
+
+    [job] = claim_jobs(db, 'isci-1', 1)
+    assert fail_job(db, job, 'HTTP 503')
+    db.expire_all()
+    assert queue_stats(db) == {PENDING: 1}
+    # Yeniden deneme zamanı gelmeden talep edilmez
+    assert claim_jobs(db, 'isci-1', 1) == []
+
+    make_available(db, job.id)
+    [job] = claim_jobs(db, 'isci-1', 1)
+    assert job.attempts == 2
+    assert fail_job(db, job, 'HTTP 503')
+    db.expire_all()
+    assert queue_stats(db) == {FAILED: 1}
+    make_available(db, job.id)
+    assert claim_jobs(db, 'isci-1', 1) == []
+
+def test_expired_lease_without_attempts_left_is_marked_failed(db, monkeypatch):
+    monkeypatch.setattr(work_queue, 'MAX_ATTEMPTS', 1)
+    enqueue_urls(URLS[:1])
+    [job] = claim_jobs(db, 'isci-1', 1)
+
+    expire_leases(db, job.id)
+    assert claim_jobs(db, 'isci-2', 1) == []
+    db.expire_all()
+    failed = db.get(ScrapeJob, job.id)
+    assert failed.status == FAILED
+    assert failed.last_error == 'Kira süresi doldu'
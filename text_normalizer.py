@@ -0,0 +1,46 @@
+import html
+import logging
+import os
+import re
+from functools import lru_cache
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tekrarlanan başlıklar için önbellek boyutu
+TEXT_CACHE_SIZE = int(os.getenv('TEXT_CACHE_SIZE', '4096'))
+
+# Sadece gerçek etiketleri eşle ("a < b" gibi metinlere dokunma)
+SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.DOTALL)
+TAG_PATTERN = re.compile(r'</?[A-Za-z][^<>]*>')
+
+def strip_tags(text: str) -> str:
+    """HTML etiketlerini hafif bir regex ile kaldır ve entity'leri çöz"""
+    text = SCRIPT_STYLE_PATTERN.sub(' ', text)
+    text = COMMENT_PATTERN.sub(' ', text)
+    text = TAG_PATTERN.sub(' ', text)
+    return html.unescape(text)
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _normalize(text: str, max_length: int) -> str:
+    # HTML yoksa parser'a hiç girme
+    if '<' in text or '&' in text:
+        text = strip_tags(text)
+    text = ' '.join(text.split())
+    return text[:max_length-3] + '...' if len(text) > max_length else text
+
+def normalize_text(text: str, max_length: int = 500) -> str:
+    """Metni HTML'den arındır, boşlukları sadeleştir ve uzunluğu sınırla"""
+    if not isinstance(text, str):
+        text = str(text)
+    return _normalize(text, max_length)
+
+def cache_info():
+    """Önbellek istatistiklerini döndür"""
+    return _normalize.cache_info()
+
+def clear_cache() -> None:
+    """Önbelleği temizle"""
+    _normalize.cache_clear()
@@ -0,0 +1,169 @@
+import cProfile
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Span logları bu seviyede yazılır (kök span'ler her zaman INFO)
+TRACE_LOG_LEVEL = getattr(logging, os.getenv('TRACE_LOG_LEVEL', 'DEBUG').upper(), logging.DEBUG)
+
+class ProfilingConfig:
+    """Çalışma zamanında açılıp kapatılabilen profil ayarları"""
+
+    def __init__(self):
+        self.enabled = os.getenv('TRACE_PROFILE', '0') == '1'
+        self.threshold_ms = float(os.getenv('TRACE_PROFILE_THRESHOLD_MS', '5000'))
+        self.output_dir = Path(os.getenv('TRACE_PROFILE_DIR', 'profiles'))
+        self.memory = os.getenv('TRACE_PROFILE_MEMORY', '1') == '1'
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'output_dir': str(self.output_dir),
+            'memory': self.memory,
+        }
+
+profiling = ProfilingConfig()
+
+# Aynı anda yalnızca bir cProfile etkin olabilir
+_profiler_lock = threading.Lock()
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """Tek bir işlem adımının zamanlaması"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start', 'duration_ms', 'status')
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status = 'ok'
+
+    def set(self, **attributes: Any) -> None:
+        """Span'e ek bilgi ekle (örn. satır sayısı)"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'span': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            **self.attributes,
+        }
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Bir adımı zamanla ve bitişte yapılandırılmış (JSON) log yaz"""
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = 'error'
+        current.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        _current_span.reset(token)
+        level = logging.INFO if parent is None else TRACE_LOG_LEVEL
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps(current.to_dict(), ensure_ascii=False, default=str))
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Fonksiyonu (senkron veya async) bir span içinde çalıştıran dekoratör"""
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _dump_profile(current: Span, profiler: Optional[cProfile.Profile],
+                  memory_snapshot: Optional[tracemalloc.Snapshot]) -> None:
+    """Eşiği aşan isteğin cProfile ve tracemalloc çıktılarını diske yaz"""
+    profiling.output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}_{current.name.replace('/', '_')}_{current.trace_id}"
+
+    if profiler is not None:
+        profile_path = profiling.output_dir / f"{stem}.prof"
+        profiler.dump_stats(str(profile_path))
+        current.set(profile=str(profile_path))
+
+    if memory_snapshot is not None:
+        memory_path = profiling.output_dir / f"{stem}.memory.txt"
+        top_stats = memory_snapshot.statistics('lineno')[:50]
+        memory_path.write_text('\n'.join(str(stat) for stat in top_stats), encoding='utf-8')
+        current.set(memory_profile=str(memory_path))
+
+@contextmanager
+def profiled(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Kök span; profil modu açıksa isteği cProfile/tracemalloc ile izler
+    ve süre eşiği aşılırsa çıktıları profiling.output_dir altına yazar
+    """
+    profiler = None
+    started_tracemalloc = False
+    if profiling.enabled and _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        if profiling.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracemalloc = True
+        profiler.enable()
+
+    try:
+        with span(name, **attributes) as current:
+            try:
+                yield current
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    elapsed_ms = (time.perf_counter() - current.start) * 1000
+                    if elapsed_ms >= profiling.threshold_ms:
+                        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+                        try:
+                            _dump_profile(current, profiler, snapshot)
+                        except Exception as e:
+                            logger.error(f"Profil kaydetme hatası: {str(e)}")
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+        if profiler is not None:
+            _profiler_lock.release()
@@ -0,0 +1,52 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from database import Product, UrlFailure
+from product_record import ProductRecord
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Başarısız URL'lerin yeniden denenme aralıkları: BASE, 2*BASE, 4*BASE ... en fazla MAX
+URL_RECHECK_BASE = float(os.getenv('URL_RECHECK_BASE', '3600'))
+URL_RECHECK_MAX = float(os.getenv('URL_RECHECK_MAX', str(7 * 24 * 3600)))
+# Bu kadar art arda başarısızlıktan sonra ürün yayından kalkmış sayılır ve stok dışı işaretlenir
+URL_DEAD_AFTER = int(os.getenv('URL_DEAD_AFTER', '3'))
+
+def recheck_delay(failure_count: int) -> timedelta:
+    """Art arda başarısızlık sayısına göre üstel bekleme süresi"""
+    exponent = min(max(failure_count - 1, 0), 32)
+    return timedelta(seconds=min(URL_RECHECK_BASE * 2 ** exponent, URL_RECHECK_MAX))
+
+def record_failure(entry: Optional[UrlFailure], product: Product, error: str,
+                   now: Optional[datetime] = None) -> UrlFailure:
+    """
+    Başarısızlığı kayda geçir ve sonraki deneme zamanını ilerlet (oturuma eklemek çağıranın işi)
+    Eşik aşılınca ürün stok dışı işaretlenir
+    """
+    now = now or datetime.utcnow()
+    if entry is None:
+        entry = UrlFailure(url=product.source_url, failure_count=0, first_failed_at=now, dead=False)
+    entry.failure_count += 1
+    entry.last_error = error
+    entry.last_failed_at = now
+    entry.next_check_at = now + recheck_delay(entry.failure_count)
+
+    if entry.failure_count >= URL_DEAD_AFTER and not entry.dead:
+        entry.dead = True
+        product.stock_status = False
+        logger.warning(
+            f"Ürün {entry.failure_count} denemedir alınamıyor, stok dışı işaretlendi: {product.source_url}"
+        )
+    return entry
+
+def record_recovery(entry: UrlFailure, product: Product, data: ProductRecord) -> None:
+    """
+    Başarılı çekimden sonra hata kaydının etkisini geri al (kaydı silmek çağıranın işi)
+    Stok dışı işaretini record_failure koyduğundan, scrape stok bilgisi vermediyse ürün tekrar stoğa alınır
+    """
+    if entry.dead and 'stock_status' not in data:
+        product.stock_status = True
+        logger.info(f"Ürün yeniden alınabiliyor, stoğa geri alındı: {product.source_url}")
@@ -1,75 +1,242 @@
 import pandas as pd
 from io import BytesIO, StringIO
+from typing import Iterator, BinaryIO, List, Union
 import csv
+import gzip
+import xlsxwriter
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+from tracing import span
+
+# Akış halinde dışa aktarımda her parçadaki satır sayısı
+CSV_CHUNK_ROWS = 5000
+
+# Excel sayfa başına satır sınırı (başlık satırı dahil)
+EXCEL_MAX_ROWS = 1048576
+# Sütun genişliği hesabı için örneklenecek en fazla satır sayısı
+EXCEL_WIDTH_SAMPLE_ROWS = 1000
+EXCEL_SHEET_NAME = 'Ürünler'
+
+# Kolonlu formatlarda tipli yazılacak sütunlar
+FLOAT_COLUMNS = ['Variant Price']
+INTEGER_COLUMNS = ['Image Position', 'Variant Inventory Qty', 'Database_ID']
+
+def clean_export_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Boş değerleri ve satır sonlarını vektörel string işlemleriyle temizle"""
+    cleaned = {}
+    for column in chunk.columns:
+        values = chunk[column].fillna('').astype(str)
+        # Satır sonlarını ve ardışık boşlukları tek boşluğa indir
+        cleaned[column] = values.str.split().str.join(' ')
+    return pd.DataFrame(cleaned, index=chunk.index, columns=chunk.columns)
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    DataFrame'i UTF-8 kodlanmış CSV parçaları halinde üretir
+    Bellek kullanımı toplam satır sayısından bağımsızdır
+    """
+    output = StringIO()
+    writer = csv.writer(output,
+                        quoting=csv.QUOTE_ALL,
+                        lineterminator='\r\n')
+
+    output.write('\ufeff')  # UTF-8 BOM ekle
+    # Başlıkları yaz
+    writer.writerow(df.columns)
+    yield output.getvalue().encode('utf-8')
+
+    for start in range(0, len(df), chunk_rows):
+        output.seek(0)
+        output.truncate()
+        chunk = clean_export_chunk(df.iloc[start:start + chunk_rows])
+        writer.writerows(zip(*(chunk[column].tolist() for column in chunk.columns)))
+        yield output.getvalue().encode('utf-8')
+
+def export_csv_to_file(df: pd.DataFrame, file: BinaryIO, chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    """CSV çıktısını parça parça dosyaya yazar, yazılan bayt sayısını döndürür"""
+    written = 0
+    for chunk in iter_csv_chunks(df, chunk_rows):
+        file.write(chunk)
+        written += len(chunk)
+    return written
+
+def sample_column_widths(df: pd.DataFrame, sample_rows: int = EXCEL_WIDTH_SAMPLE_ROWS) -> List[int]:
+    """Sütun genişliklerini tüm tablo yerine sınırlı bir örneklemden hesapla"""
+    if len(df) > sample_rows:
+        # Baştaki satırlar + tabloya eşit aralıklarla yayılmış satırlar
+        head = sample_rows // 2
+        step = max(len(df) // (sample_rows - head), 1)
+        sample = pd.concat([df.iloc[:head], df.iloc[head::step]])
+    else:
+        sample = df
+
+    widths = []
+    for column in df.columns:
+        lengths = sample[column].fillna('').astype(str).str.len()
+        max_length = max(int(lengths.max()) if len(lengths) else 0, len(str(column)))
+        widths.append(min(max_length + 2, 50))
+    return widths
+
+def export_excel_to_file(df: pd.DataFrame, file: Union[str, BinaryIO],
+                         max_rows_per_sheet: int = EXCEL_MAX_ROWS,
+                         chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    """
+    DataFrame'i xlsxwriter'ın constant_memory kipiyle satır satır yazar
+    Satır sınırı aşıldığında otomatik olarak yeni sayfaya geçer, oluşturulan sayfa sayısını döndürür
+    """
+    workbook = xlsxwriter.Workbook(file, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'nan_inf_to_errors': True
+    })
+
+    # Başlık formatı
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#f0f0f0',
+        'border': 1,
+        'text_wrap': True,
+        'align': 'center',
+        'valign': 'vcenter'
+    })
+
+    columns = list(df.columns)
+    widths = sample_column_widths(df)
+    rows_per_sheet = max_rows_per_sheet - 1  # Başlık satırı
+
+    def add_sheet(number: int):
+        name = EXCEL_SHEET_NAME if number == 1 else f"{EXCEL_SHEET_NAME} {number}"
+        worksheet = workbook.add_worksheet(name)
+        # Sütunları formatla
+        for col_num, width in enumerate(widths):
+            worksheet.set_column(col_num, col_num, width)
+        worksheet.write_row(0, 0, [str(column) for column in columns], header_format)
+        return worksheet
+
+    sheet_count = 1
+    worksheet = add_sheet(sheet_count)
+    row_num = 0
+    for start in range(0, len(df), chunk_rows):
+        # Boş değerleri temizle
+        chunk = df.iloc[start:start + chunk_rows].fillna('')
+        for values in chunk.itertuples(index=False, name=None):
+            if row_num == rows_per_sheet:
+                sheet_count += 1
+                worksheet = add_sheet(sheet_count)
+                row_num = 0
+            row_num += 1
+            worksheet.write_row(row_num, 0, values)
+
+    workbook.close()
+    return sheet_count
+
+def typed_export_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Fiyatı float, pozisyon ve ID'leri tam sayı, diğer metin sütunlarını string olarak tiple"""
+    typed = {}
+    for column in chunk.columns:
+        values = chunk[column]
+        if column in FLOAT_COLUMNS:
+            values = pd.to_numeric(values.replace('', None), errors='coerce').astype('float64')
+        elif column in INTEGER_COLUMNS:
+            values = pd.to_numeric(values.replace('', None), errors='coerce').astype('Int64')
+        elif values.dtype == object:
+            values = values.astype('string')
+        typed[column] = values
+    return pd.DataFrame(typed, index=chunk.index, columns=chunk.columns)
+
+def iter_arrow_batches(df: pd.DataFrame, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[pa.Table]:
+    """DataFrame'i aynı şemaya sahip Arrow tabloları halinde parça parça üretir"""
+    schema = None
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = typed_export_chunk(df.iloc[start:start + chunk_rows])
+        table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        if schema is None:
+            schema = table.schema
+        yield table
+
+def export_parquet_to_file(df: pd.DataFrame, file: Union[str, BinaryIO],
+                           chunk_rows: int = CSV_CHUNK_ROWS, compression: str = 'zstd') -> None:
+    """Parquet dosyasını her parça ayrı bir row group olacak şekilde yazar"""
+    writer = None
+    try:
+        for table in iter_arrow_batches(df, chunk_rows):
+            if writer is None:
+                writer = pq.ParquetWriter(file, table.schema, compression=compression)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_arrow_to_file(df: pd.DataFrame, file: Union[str, BinaryIO],
+                         chunk_rows: int = CSV_CHUNK_ROWS, compression: str = 'zstd') -> None:
+    """Arrow IPC (Feather v2) dosyasını record batch'ler halinde yazar"""
+    writer = None
+    try:
+        for table in iter_arrow_batches(df, chunk_rows):
+            if writer is None:
+                options = pa_ipc.IpcWriteOptions(compression=compression)
+                writer = pa_ipc.new_file(file, table.schema, options=options)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_jsonl_to_file(df: pd.DataFrame, file: Union[str, BinaryIO],
+                         chunk_rows: int = CSV_CHUNK_ROWS) -> None:
+    """gzip ile sıkıştırılmış JSON Lines dosyasını parça parça yazar"""
+    with gzip.open(file, 'wb') as output:
+        for start in range(0, len(df), chunk_rows):
+            chunk = typed_export_chunk(df.iloc[start:start + chunk_rows])
+            lines = chunk.to_json(orient='records', lines=True, force_ascii=False)
+            # pandas >= 1.5 son satırı yeni satırla bitirir; parçalar arasında boş satır kalmamalı
+            if lines and not lines.endswith('\n'):
+                lines += '\n'
+            output.write(lines.encode('utf-8'))
+
+def read_export(file: Union[str, BinaryIO], format_type: str) -> pd.DataFrame:
+    """parquet, arrow veya jsonl formatında dışa aktarılmış dosyayı geri yükler"""
+    if format_type == 'parquet':
+        return pq.read_table(file).to_pandas()
+    elif format_type == 'arrow':
+        with pa_ipc.open_file(file) as reader:
+            return reader.read_all().to_pandas()
+    elif format_type == 'jsonl':
+        df = pd.read_json(file, orient='records', lines=True, compression='gzip',
+                          dtype=False, convert_dates=False)
+        return typed_export_chunk(df)
+    raise ValueError("Desteklenmeyen format türü")
+
+COLUMNAR_EXPORTERS = {
+    'parquet': export_parquet_to_file,
+    'arrow': export_arrow_to_file,
+    'jsonl': export_jsonl_to_file,
+}
 
 def export_data(df: pd.DataFrame, format_type: str) -> bytes:
     """
     DataFrame'i belirtilen formatta dışa aktarır
     """
     try:
-        # DataFrame'i kopyala
-        export_df = df.copy()
+        with span('utils.export_data', format=format_type, rows=len(df)) as export_span:
+            if format_type == 'csv':
+                content = b''.join(iter_csv_chunks(df))
 
-        # Boş değerleri temizle
-        export_df = export_df.fillna('')
-
-        if format_type == 'csv':
-            # CSV dosyasını oluştur
-            output = StringIO()
-            output.write('\ufeff')  # UTF-8 BOM ekle
-
-            writer = csv.writer(output,
-                              quoting=csv.QUOTE_ALL,
-                              lineterminator='\r\n')
-
-            # Başlıkları yaz
-            writer.writerow(df.columns)
-
-            # Verileri yaz
-            for _, row in export_df.iterrows():
-                cleaned_row = []
-                for val in row:
-                    if pd.isna(val):
-                        cleaned_row.append('')
-                    else:
-                        val = str(val).replace('\n', ' ').replace('\r', ' ')
-                        val = ' '.join(val.split())
-                        cleaned_row.append(val)
-                writer.writerow(cleaned_row)
-
-            return output.getvalue().encode('utf-8')
-
-        elif format_type == 'excel':
-            excel_buffer = BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-                export_df.to_excel(writer, index=False, sheet_name='Ürünler')
-                workbook = writer.book
-                worksheet = writer.sheets['Ürünler']
-
-                # Başlık formatı
-                header_format = workbook.add_format({
-                    'bold': True,
-                    'bg_color': '#f0f0f0',
-                    'border': 1,
-                    'text_wrap': True,
-                    'align': 'center',
-                    'valign': 'vcenter'
-                })
-
-                # Sütunları formatla
-                for col_num, value in enumerate(export_df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-                    max_length = max(
-                        export_df[value].astype(str).apply(len).max(),
-                        len(str(value))
-                    )
-                    worksheet.set_column(col_num, col_num, min(max_length + 2, 50))
-
-            excel_buffer.seek(0)
-            return excel_buffer.getvalue()
-
-        else:
-            raise ValueError("Desteklenmeyen format türü")
+            elif format_type == 'excel':
+                excel_buffer = BytesIO()
+                export_excel_to_file(df, excel_buffer)
+                content = excel_buffer.getvalue()
+
+            elif format_type in COLUMNAR_EXPORTERS:
+                buffer = BytesIO()
+                COLUMNAR_EXPORTERS[format_type](df, buffer)
+                content = buffer.getvalue()
+
+            else:
+                raise ValueError("Desteklenmeyen format türü")
+
+            export_span.set(size=len(content))
+            return content
 
     except Exception as e:
-        raise Exception("Dışa aktarma hatası: %s" % str(e))
\ No newline at end of file
+        raise Exception("Dışa aktarma hatası: %s" % str(e))
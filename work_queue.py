@@ -0,0 +1,157 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import select, update, or_, and_, func
+from sqlalchemy.orm import Session
+from database import get_db, ScrapeJob, Product
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kuyruk ayarları
+LEASE_SECONDS = int(os.getenv('QUEUE_LEASE_SECONDS', '120'))
+MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', '3'))
+RETRY_DELAY_SECONDS = int(os.getenv('QUEUE_RETRY_DELAY_SECONDS', '60'))
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+def enqueue_urls(urls: Iterable[str]) -> int:
+    """URL'leri kuyruğa ekle; zaten bekleyen veya işlenen URL'ler atlanır"""
+    db = next(get_db())
+    try:
+        urls = list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+        if not urls:
+            return 0
+        active = set(db.execute(
+            select(ScrapeJob.url).where(ScrapeJob.url.in_(urls), ScrapeJob.status.in_([PENDING, RUNNING]))
+        ).scalars())
+        jobs = [ScrapeJob(url=url) for url in urls if url not in active]
+        db.add_all(jobs)
+        db.commit()
+        logger.info(f"{len(jobs)} iş kuyruğa eklendi")
+        return len(jobs)
+    finally:
+        db.close()
+
+def enqueue_known_products() -> int:
+    """Kayıtlı tüm ürünleri yenileme için kuyruğa ekle"""
+    db = next(get_db())
+    try:
+        urls = db.execute(select(Product.source_url).where(Product.source_url.isnot(None))).scalars().all()
+    finally:
+        db.close()
+    return enqueue_urls(urls)
+
+def claimable_condition(now: datetime):
+    """Bekleyen veya kirası dolmuş (çökmüş işçiye ait) işler"""
+    return and_(
+        ScrapeJob.attempts < MAX_ATTEMPTS,
+        or_(
+            and_(ScrapeJob.status == PENDING, ScrapeJob.available_at <= now),
+            and_(ScrapeJob.status == RUNNING, ScrapeJob.lease_expires_at < now),
+        )
+    )
+
+def claim_jobs(db: Session, worker_id: str, batch_size: int) -> List[ScrapeJob]:
+    """
+    Bir grup işi kiralayarak talep et
+    PostgreSQL'de FOR UPDATE SKIP LOCKED, diğer veritabanlarında tek atomik UPDATE kullanılır
+    """
+    now = datetime.utcnow()
+    # Deneme hakkı bitmiş ve kirası dolmuş işler bir daha talep edilmez
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.status == RUNNING, ScrapeJob.lease_expires_at < now, ScrapeJob.attempts >= MAX_ATTEMPTS)
+        .values(status=FAILED, lease_token=None, lease_expires_at=None, last_error='Kira süresi doldu')
+        .execution_options(synchronize_session=False)
+    )
+
+    token = uuid.uuid4().hex
+    lease = {
+        'status': RUNNING,
+        'lease_token': token,
+        'leased_by': worker_id,
+        'lease_expires_at': now + timedelta(seconds=LEASE_SECONDS),
+        'attempts': ScrapeJob.attempts + 1,
+    }
+    candidates = (
+        select(ScrapeJob.id)
+        .where(claimable_condition(now))
+        .order_by(ScrapeJob.id)
+        .limit(batch_size)
+    )
+
+    if db.bind.dialect.name == 'postgresql':
+        job_ids = db.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+        if not job_ids:
+            db.commit()
+            return []
+        db.execute(update(ScrapeJob).where(ScrapeJob.id.in_(job_ids)).values(**lease))
+    else:
+        # SQLite yazma işlemlerini sıraya koyar; alt sorgu + UPDATE tek adımda atomiktir
+        db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id.in_(candidates.scalar_subquery()), claimable_condition(now))
+            .values(**lease)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+    return db.execute(
+        select(ScrapeJob).where(ScrapeJob.lease_token == token).order_by(ScrapeJob.id)
+    ).scalars().all()
+
+def heartbeat(db: Session, job_ids: List[int], worker_id: str) -> int:
+    """Devam eden işlerin kirasını uzat; uzatılan iş sayısını döndürür"""
+    if not job_ids:
+        return 0
+    result = db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(job_ids), ScrapeJob.leased_by == worker_id, ScrapeJob.status == RUNNING)
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def complete_job(db: Session, job: ScrapeJob, product_id: Optional[int]) -> bool:
+    """İşi tamamlandı olarak işaretle; kira başka işçiye geçtiyse False döner"""
+    result = db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id == job.id, ScrapeJob.lease_token == job.lease_token)
+        .values(status=DONE, product_id=product_id, lease_token=None, lease_expires_at=None, last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def fail_job(db: Session, job: ScrapeJob, error: str) -> bool:
+    """Başarısız işi yeniden denemeye al veya deneme hakkı bittiyse kalıcı olarak başarısız say"""
+    exhausted = job.attempts >= MAX_ATTEMPTS
+    # Her denemede bekleme süresi ikiye katlanır
+    delay = RETRY_DELAY_SECONDS * (2 ** max(job.attempts - 1, 0))
+    result = db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id == job.id, ScrapeJob.lease_token == job.lease_token)
+        .values(
+            status=FAILED if exhausted else PENDING,
+            available_at=datetime.utcnow() + timedelta(seconds=delay),
+            lease_token=None,
+            lease_expires_at=None,
+            last_error=error[:2000],
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def queue_stats(db: Session) -> dict:
+    """Durumlara göre iş sayıları"""
+    rows = db.execute(select(ScrapeJob.status, func.count()).group_by(ScrapeJob.status))
+    return {status: count for status, count in rows}
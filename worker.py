@@ -0,0 +1,175 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set
+from sqlalchemy import select
+from database import get_db, init_db, Product, ScrapeJob
+from data_processor import apply_scraped_update, prepare_items, persist_products
+from pricing import reprice_catalog
+from product_record import ProductRecord
+from scraper import scrape_website_sync
+from tracing import span
+import work_queue
+
+# Logging ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# İşçi ayarları
+WORKER_BATCH_SIZE = int(os.getenv('WORKER_BATCH_SIZE', '10'))
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '4'))
+WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', '5'))
+
+def save_scrape_result(url: str, data: ProductRecord) -> Optional[int]:
+    """Scrape sonucunu kaydet: ürün varsa güncelle, yoksa yeni ürün oluştur"""
+    db = next(get_db())
+    try:
+        product = db.execute(
+            select(Product).where(Product.source_url == url).order_by(Product.id).limit(1)
+        ).scalar_one_or_none()
+        if product is not None:
+            if not apply_scraped_update(db, product, data):
+                raise ValueError("Geçersiz fiyat")
+            db.commit()
+            reprice_catalog(product_ids=[product.id])
+            return product.id
+    finally:
+        db.close()
+
+    items = prepare_items([data])
+    if items.empty:
+        raise ValueError("Ürün verisi geçersiz")
+    product_id = persist_products(items, url)[0]
+    if product_id is None:
+        raise RuntimeError("Ürün kaydedilemedi")
+    return product_id
+
+class Worker:
+    """Kuyruktan iş talep eden, scrape edip sonucu kaydeden bağımsız işçi"""
+
+    def __init__(self, batch_size: int = WORKER_BATCH_SIZE, concurrency: int = WORKER_CONCURRENCY,
+                 poll_interval: float = WORKER_POLL_INTERVAL, worker_id: Optional[str] = None):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._active: Set[int] = set()
+        self._active_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self, *_args) -> None:
+        logger.info(f"İşçi durduruluyor: {self.worker_id}")
+        self._stop.set()
+
+    def _heartbeat_loop(self) -> None:
+        """Çalışan işlerin kirasını düzenli olarak uzat"""
+        interval = max(work_queue.LEASE_SECONDS / 3, 1)
+        while not self._stop.wait(interval):
+            with self._active_lock:
+                job_ids = list(self._active)
+            if not job_ids:
+                continue
+            db = next(get_db())
+            try:
+                work_queue.heartbeat(db, job_ids, self.worker_id)
+            except Exception as e:
+                logger.error(f"Heartbeat hatası: {str(e)}")
+            finally:
+                db.close()
+
+    def process_job(self, job: ScrapeJob) -> bool:
+        """Tek bir işi çalıştır ve sonucunu kuyruğa bildir"""
+        db = next(get_db())
+        try:
+            with span('worker.job', job_id=job.id, url=job.url, attempt=job.attempts):
+                result = scrape_website_sync(job.url)
+                if not result:
+                    raise ValueError("Veri çekilemedi")
+                product_id = save_scrape_result(job.url, result[0])
+            return work_queue.complete_job(db, job, product_id)
+        except Exception as e:
+            logger.warning(f"İş başarısız ({job.url}): {str(e)}")
+            work_queue.fail_job(db, job, str(e))
+            return False
+        finally:
+            with self._active_lock:
+                self._active.discard(job.id)
+            db.close()
+
+    def run_batch(self, executor: ThreadPoolExecutor) -> int:
+        """Bir grup iş talep et ve işle; talep edilen iş sayısını döndürür"""
+        db = next(get_db())
+        try:
+            jobs: List[ScrapeJob] = work_queue.claim_jobs(db, self.worker_id, self.batch_size)
+        finally:
+            db.close()
+
+        if not jobs:
+            return 0
+
+        with self._active_lock:
+            self._active.update(job.id for job in jobs)
+        results = list(executor.map(self.process_job, jobs))
+        logger.info(f"{self.worker_id}: {sum(results)}/{len(jobs)} iş tamamlandı")
+        return len(jobs)
+
+    def run(self, once: bool = False) -> None:
+        """Kuyruk boşalana (once=True) veya durdurulana kadar iş işle"""
+        logger.info(f"İşçi başladı: {self.worker_id} (batch={self.batch_size}, eşzamanlılık={self.concurrency})")
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat_thread.start()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stop.is_set():
+                try:
+                    claimed = self.run_batch(executor)
+                except Exception as e:
+                    logger.error(f"İş talep hatası: {str(e)}")
+                    claimed = 0
+                if claimed == 0:
+                    if once:
+                        break
+                    self._stop.wait(self.poll_interval)
+
+        self._stop.set()
+        logger.info(f"İşçi durdu: {self.worker_id}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Veritabanı kuyruğundan ürün scrape eden işçi")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="İşçiyi başlat")
+    run_parser.add_argument('--batch-size', type=int, default=WORKER_BATCH_SIZE)
+    run_parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY)
+    run_parser.add_argument('--poll-interval', type=float, default=WORKER_POLL_INTERVAL)
+    run_parser.add_argument('--once', action='store_true', help="Kuyruk boşalınca çık")
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="Dosyadaki URL'leri kuyruğa ekle")
+    enqueue_parser.add_argument('file', help="Her satırda bir URL içeren dosya")
+
+    subparsers.add_parser('enqueue-products', help="Kayıtlı tüm ürünleri yenileme için kuyruğa ekle")
+    subparsers.add_parser('stats', help="Kuyruk durumunu göster")
+
+    args = parser.parse_args()
+    init_db()
+
+    if args.command == 'run':
+        worker = Worker(args.batch_size, args.concurrency, args.poll_interval)
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        worker.run(once=args.once)
+    elif args.command == 'enqueue':
+        with open(args.file, encoding='utf-8') as f:
+            work_queue.enqueue_urls(f.read().splitlines())
+    elif args.command == 'enqueue-products':
+        work_queue.enqueue_known_products()
+    elif args.command == 'stats':
+        db = next(get_db())
+        try:
+            logger.info(f"Kuyruk durumu: {work_queue.queue_stats(db)}")
+        finally:
+            db.close()